@@ -1,38 +1,626 @@
-from flask import Flask, request, jsonify, abort, Response, current_app
-from flask_socketio import SocketIO, join_room
 import eventlet; eventlet.monkey_patch(socket=True, select=True, thread=True, time=True, os=True)
+from flask import Flask, request, jsonify, abort, Response, current_app, url_for, stream_with_context, has_request_context
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_socketio import SocketIO, join_room
 import os
+import select
+import threading
+import json
+import time
+import io
+import csv
+import zipfile
+import math
+import hashlib
+import hmac
+import uuid
+import gzip
+from collections import OrderedDict
+import socketio as socketio_lib
 import jwt
 import datetime
 import bcrypt
 from functools import wraps
 from dotenv import load_dotenv
-from flasgger import Swagger, swag_from
 import psycopg2
-from psycopg2 import pool
+import psycopg2.sql
+from psycopg2 import pool, errors
+from queries import (
+    ACCOMMODATION_DETAILS_SQL, ACCOMMODATION_DETAILS_ENRICHED_SQL, ACCOMMODATION_VIEWER_SQL,
+    ACCOMMODATION_IMAGE_SQL, ACCOMMODATION_CARDS_SQL, USER_LOGIN_SQL, LIKE_TOGGLE_SQL, LIKED_ACCOMMODATIONS_SQL,
+    MY_ACCOMMODATIONS_SQL, RESERVATION_CONFLICT_SQL, MY_RESERVATIONS_SQL, UPCOMING_RESERVATIONS_SQL,
+    OWNER_DASHBOARD_SQL, build_search_query, encode_search_cursor, parse_search_request, enriched_accommodation
+)
+from shared_state import SharedSlots, RATE_LIMITS, take_token, metric_inc, metric_set, read_metrics
 import requests
 import logging
 from datetime import date
+from urllib.parse import parse_qsl, urlencode
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 load_dotenv()
+# "flasgger" builds the docs from the @swag_from specs at runtime (development);
+# "static" serves the openapi.json compiled by build_openapi.py without loading flasgger.
+API_DOCS = os.environ.get("API_DOCS", "flasgger")
+OPENAPI_SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openapi.json")
+
+if API_DOCS == "flasgger":
+    from flasgger import Swagger, swag_from
+else:
+    def swag_from(specs):
+        return lambda f: f
+
 app = Flask(__name__)
 app.logger.setLevel(logging.DEBUG)
 SECRET_KEY = os.environ.get("SECRET_KEY")
+# Bearer token Prometheus sends to /metrics; without one the endpoint is not served
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
 DATABASE_URL = os.environ.get("DATABASE_URL")
-
-db_pool = pool.ThreadedConnectionPool(
-    minconn=1,
-    maxconn=20,
-    dsn=DATABASE_URL
+# Socket.IO fan-out between gunicorn workers. Defaults to Postgres LISTEN/NOTIFY
+# on the main database; any URL Flask-SocketIO understands (redis://, amqp://...)
+# can be used instead.
+SOCKETIO_MESSAGE_QUEUE = os.environ.get("SOCKETIO_MESSAGE_QUEUE", DATABASE_URL)
+SOCKETIO_CHANNEL = os.environ.get("SOCKETIO_CHANNEL", "flask_socketio")
+# Seconds between like-notification digests per owner; 0 pushes every toggle immediately.
+NOTIFY_FLUSH_INTERVAL = float(os.environ.get("NOTIFY_FLUSH_INTERVAL", "10"))
+# Maximum number of accommodation ids accepted by /accommodations/batch
+BATCH_MAX_IDS = int(os.environ.get("BATCH_MAX_IDS", "50"))
+# Maximum number of GET sub-requests accepted by /batch
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "20"))
+# Reverse proxies in front of the app whose X-Forwarded-* headers are trusted; 0 trusts none.
+# Per-IP rate limits key on the client address these resolve to.
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", "0"))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT,
+                            x_host=TRUSTED_PROXY_COUNT)
+
+# Full-text document for accommodations.search_vector: name weighs more than description.
+# Must stay in sync with the backfill in migrations.py.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(%s, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(%s, '')), 'B')"
 )
+# Page size cap for /search-accommodations keyset pagination
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", "100"))
+# Seconds a search result (ordered aid list) is reused for identical searches; 0 disables caching
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", "30"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+# Seconds the shared part of an enriched accommodation detail is reused; 0 disables caching
+DETAIL_CACHE_TTL = float(os.environ.get("DETAIL_CACHE_TTL", "60"))
+DETAIL_CACHE_MAX_ENTRIES = int(os.environ.get("DETAIL_CACHE_MAX_ENTRIES", "2000"))
+# Soft-deleted accommodations: rows removed per purge transaction and the pause between them
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", "20"))
+PURGE_BATCH_PAUSE = float(os.environ.get("PURGE_BATCH_PAUSE", "0.2"))
+PURGE_IDLE_INTERVAL = float(os.environ.get("PURGE_IDLE_INTERVAL", "60"))
+# Background jobs: green-thread workers per process, poll interval when idle, seconds a
+# claimed job is leased before another worker may retry it, and retry backoff (doubling)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "300"))
+JOB_BACKOFF_BASE = float(os.environ.get("JOB_BACKOFF_BASE", "5"))
+JOB_BACKOFF_MAX = float(os.environ.get("JOB_BACKOFF_MAX", "3600"))
+# NOTIFY channel telling every worker which accommodations changed
+ACCOMMODATION_CHANGED_CHANNEL = "accommodation_changed"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_PAYLOAD = 7999
+# Bulk import row cap per upload. Background geocoding (jobs, bulk import) shares one host-wide
+# Nominatim budget of GEOCODE_RATE_PER_SEC (their usage policy allows 1 request/s), with up
+# to GEOCODE_BATCH_SIZE requests in flight per import
+BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", "1000"))
+GEOCODE_RATE_PER_SEC = float(os.environ.get("GEOCODE_RATE_PER_SEC", "1"))
+GEOCODE_BATCH_SIZE = int(os.environ.get("GEOCODE_BATCH_SIZE", "1"))
+# Seconds a Nominatim request may take; a timeout fails the request (background jobs retry it)
+GEOCODE_TIMEOUT = float(os.environ.get("GEOCODE_TIMEOUT", "10"))
+# Seconds an Idempotency-Key and its stored response are kept
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", "86400"))
+# Seconds a duplicate request waits for the first one with the same key to finish
+IDEMPOTENCY_WAIT = float(os.environ.get("IDEMPOTENCY_WAIT", "30"))
+IDEMPOTENCY_POLL_INTERVAL = float(os.environ.get("IDEMPOTENCY_POLL_INTERVAL", "0.25"))
+# A claim without a response after this many seconds belongs to a dead request and is taken over
+IDEMPOTENCY_CLAIM_TIMEOUT = float(os.environ.get("IDEMPOTENCY_CLAIM_TIMEOUT", "120"))
+# Response compression: bodies smaller than this go out as is; gzip level 1-9, brotli quality 0-11
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+# Bytes of compressed bodies kept per worker, so repeated (cached) payloads aren't recompressed
+COMPRESS_CACHE_MAX_BYTES = int(os.environ.get("COMPRESS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Rows fetched per round trip by server-side cursors of streamed (?stream=1) list responses
+STREAM_ITERSIZE = int(os.environ.get("STREAM_ITERSIZE", "500"))
+
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "20"))
+# Seconds getconn waits for a free connection before the request is shed with a 503
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "2"))
+# Optional read-only replica for the read endpoints (READ_ENDPOINTS)
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+# Reads fall back to the primary while the replica is further behind than this
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", "10"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get("REPLICA_LAG_CHECK_INTERVAL", "5"))
+# After a write, that user's reads stay on the primary until the replica has replayed it, for
+# up to this many seconds; never less than the staleness a replica read is allowed
+READ_PIN_SECONDS = max(float(os.environ.get("READ_PIN_SECONDS", "15")), REPLICA_MAX_LAG + REPLICA_LAG_CHECK_INTERVAL)
+# Per-worker admission per route class as "concurrency:queue:deadline seconds", overridable
+# with ADMIT_<CLASS>. The gated classes together stay below DB_POOL_MAX so ungated reads and
+# the background tasks (job workers, purger, lag monitor) still get connections; anything
+# that finds the pool empty anyway waits DB_POOL_TIMEOUT and is then shed with a 503.
+ADMISSION_LIMITS = {
+    route_class: os.environ.get(f"ADMIT_{route_class.upper()}", default)
+    for route_class, default in (("images", "4:12:0.5"), ("search", "4:12:1"),
+                                 ("writes", "6:32:2"), ("auth", "2:8:1"))
+}
+
+class PoolTimeout(pool.PoolError):
+    """No connection became free within DB_POOL_TIMEOUT."""
+
+class ProcessLocalPool:
+    """ThreadedConnectionPool created lazily in each process.
+
+    Importing the app (e.g. gunicorn --preload) opens no connections, and a forked
+    worker never reuses libpq sockets inherited from its parent. Checkouts beyond
+    maxconn wait for a returned connection instead of failing at once.
+    """
+
+    def __init__(self, dsn, minconn, maxconn):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.pool = None
+        self.pid = None
+        self.inherited = []
+        self.lock = threading.Lock()
+        self.free = None
+
+    def get_pool(self):
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    if self.pool is not None:
+                        # Keep the parent's pool referenced: finalizing it here would send
+                        # Terminate on sockets the parent still uses.
+                        self.inherited.append(self.pool)
+                    self.pool = pool.ThreadedConnectionPool(minconn=self.minconn, maxconn=self.maxconn, dsn=self.dsn)
+                    self.free = threading.BoundedSemaphore(self.maxconn)
+                    self.pid = os.getpid()
+        return self.pool
+
+    def getconn(self):
+        conn_pool = self.get_pool()
+        # ThreadedConnectionPool raises PoolError when exhausted; queue for a slot instead
+        if not self.free.acquire(timeout=DB_POOL_TIMEOUT):
+            metric_inc("db_pool_timeouts_total")
+            raise PoolTimeout(f"No database connection free within {DB_POOL_TIMEOUT}s")
+        try:
+            return conn_pool.getconn()
+        except Exception:
+            self.free.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        self.get_pool().putconn(conn, close=close)
+        self.free.release()
+
+    def warm_up(self, statements=()) -> None:
+        """Open minconn connections and run each statement's EXPLAIN on them.
+
+        Planning loads the catalog and relation caches of every backend, so the
+        first real requests don't pay for it.
+        """
+        conns = [self.getconn() for _ in range(self.minconn)]
+        try:
+            for conn in conns:
+                with conn.cursor() as cur:
+                    for sql, params in statements:
+                        cur.execute("EXPLAIN " + sql, params)
+                conn.rollback()
+        finally:
+            for conn in conns:
+                self.putconn(conn)
+
+# uid -> (time until which the user is pinned, primary WAL position in bytes after their last write)
+read_pins = SharedSlots("read-pins", 65536, width=2)
+
+# Endpoints that only read and may be served from the replica
+READ_ENDPOINTS = {
+    'get_accommodation_details', 'search_accommodations', 'get_accommodation_image',
+    'main_screen_accommodations', 'get_my_accommodations', 'get_my_reservations',
+    'get_liked_accommodations', 'upcoming_reservations', 'accommodations_batch',
+    'accommodation_confirmation', 'owner_dashboard', 'batch',
+}
+
+ROUTE_CLASSES = {
+    'get_accommodation_image': 'images',
+    'search_accommodations': 'search',
+    'main_screen_accommodations': 'search',
+    'accommodations_batch': 'search',
+    # /batch itself is not gated: each sub-request is admitted under its own class
+    'make_reservation': 'writes',
+    'delete_reservation': 'writes',
+    'add_accommodation': 'writes',
+    'bulk_import_accommodations': 'writes',
+    'edit_accommodation': 'writes',
+    'patch_accommodation': 'writes',
+    'delete_accommodation': 'writes',
+    'like_dislike_accommodation': 'writes',
+    'login': 'auth',
+    'register': 'auth',
+}
+
+class AdmissionGate:
+    """Concurrency limit with a bounded wait queue; callers that can't get in by the deadline are shed."""
+
+    def __init__(self, spec: str):
+        concurrency, queue, deadline = spec.split(":")
+        self.slots = threading.BoundedSemaphore(int(concurrency))
+        self.max_waiting = int(queue)
+        self.deadline = float(deadline)
+        self.waiting = 0
+
+    def enter(self) -> bool:
+        if self.slots.acquire(blocking=False):
+            return True
+        if self.waiting >= self.max_waiting:
+            return False
+        self.waiting += 1
+        try:
+            return self.slots.acquire(timeout=self.deadline)
+        finally:
+            self.waiting -= 1
+
+    def leave(self) -> None:
+        self.slots.release()
+
+admission_gates = {route_class: AdmissionGate(spec) for route_class, spec in ADMISSION_LIMITS.items()}
+
+class RoutingPool:
+    """Hands out primary connections, or replica ones for READ_ENDPOINTS.
+
+    A user who wrote within READ_PIN_SECONDS reads from the primary until the replica has
+    replayed the WAL position recorded after their write, so they always see their own
+    change; everyone does while the replica lags beyond REPLICA_MAX_LAG. The choice is
+    made once per request, so e.g. a list and its ETag version come from the same database.
+    """
+
+    def __init__(self, primary, replica=None):
+        self.primary = primary
+        self.replica = replica
+        self.owners = {}
+        self.replica_lag = None
+        # Replica replay position in bytes as of the last lag check (it only moves forward)
+        self.replica_lsn = 0.0
+        self.lag_monitor_pid = None
+
+    def use_replica(self) -> bool:
+        if self.replica is None or not has_request_context() or request.endpoint not in READ_ENDPOINTS:
+            return False
+        decided = request.environ.get('roomfinder.use_replica')
+        if decided is None:
+            decided = request.environ['roomfinder.use_replica'] = self.replica_is_current()
+        return decided
+
+    def replica_is_current(self) -> bool:
+        if self.lag_monitor_pid != os.getpid():
+            self.lag_monitor_pid = os.getpid()
+            socketio.start_background_task(self.monitor_replica_lag)
+        if self.replica_lag is None or self.replica_lag > REPLICA_MAX_LAG:
+            return False
+        user = getattr(request, 'user', None)
+        if user:
+            pinned_until, written_lsn = read_pins.get(user['uid'])
+            if pinned_until > time.time():
+                # 0 means the position could not be read: stay on the primary for the whole pin
+                return 0 < written_lsn <= self.replica_lsn
+        return True
+
+    def primary_wal_position(self) -> float:
+        """The primary's current WAL position in bytes, or 0 if it cannot be read."""
+        try:
+            conn = self.primary.getconn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_current_wal_lsn() - '0/0'::pg_lsn;")
+                    position = float(cur.fetchone()[0])
+                conn.rollback()
+            finally:
+                self.primary.putconn(conn)
+            return position
+        except Exception as e:
+            app.logger.error(f"Reading the primary WAL position failed: {e}")
+            return 0.0
+
+    def getconn(self):
+        # /batch sub-requests all run on the connection checked out by the batch itself
+        shared = request.environ.get('roomfinder.db_conn') if has_request_context() else None
+        if shared is not None:
+            return shared
+        target = self.replica if self.use_replica() else self.primary
+        conn = target.getconn()
+        self.owners[id(conn)] = target
+        metric_inc("roomfinder_db_checkouts_total", database="replica" if target is self.replica else "primary")
+        return conn
+
+    def snapshot_time(self, conn, started_at: float) -> float:
+        """Monotonic time whose committed changes a query started at started_at is sure to see.
+
+        A replica can be up to REPLICA_MAX_LAG behind, plus whatever it fell back since the
+        last lag check, so its results are treated as that much older. Cache fills compare
+        this against search_cache_invalidated_at and skip results that may predate a change.
+        """
+        if self.replica is not None and self.owners.get(id(conn)) is self.replica:
+            return started_at - REPLICA_MAX_LAG - REPLICA_LAG_CHECK_INTERVAL
+        return started_at
+
+    def putconn(self, conn, close=False):
+        if has_request_context() and request.environ.get('roomfinder.db_conn') is conn:
+            return
+        self.owners.pop(id(conn), self.primary).putconn(conn, close=close)
+
+    def warm_up(self, statements=()) -> None:
+        self.primary.warm_up(statements)
+        if self.replica is not None:
+            self.replica.warm_up(statements)
+
+    def monitor_replica_lag(self) -> None:
+        while True:
+            try:
+                conn = self.replica.getconn()
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("""
+                            SELECT
+                                CASE
+                                    WHEN NOT pg_is_in_recovery() THEN 0
+                                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                                END,
+                                CASE
+                                    WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()
+                                    ELSE pg_current_wal_lsn()
+                                END - '0/0'::pg_lsn;
+                        """)
+                        lag, lsn = cur.fetchone()
+                        self.replica_lag = float(lag)
+                        self.replica_lsn = max(self.replica_lsn, float(lsn or 0))
+                    conn.rollback()
+                finally:
+                    self.replica.putconn(conn)
+                metric_set("roomfinder_replica_lag_seconds", self.replica_lag)
+            except Exception as e:
+                self.replica_lag = None
+                app.logger.error(f"Replica lag check failed: {e}")
+            socketio.sleep(REPLICA_LAG_CHECK_INTERVAL)
+
+db_pool = RoutingPool(
+    ProcessLocalPool(DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX),
+    ProcessLocalPool(DATABASE_REPLICA_URL, DB_POOL_MIN, DB_POOL_MAX) if DATABASE_REPLICA_URL else None
+)
+
+def warm_up_db_pool() -> None:
+    """Called from gunicorn's post_fork hook, before the worker accepts requests."""
+    from migrations import PLAN_CHECKS
+    started_at = time.monotonic()
+    db_pool.warm_up([(sql, params) for _, sql, params, _ in PLAN_CHECKS])
+    app.logger.info(f"DB pool warmed up in {time.monotonic() - started_at:.3f}s (pid {os.getpid()})")
+
+@app.before_request
+def admit_request():
+    route_class = ROUTE_CLASSES.get(request.endpoint)
+    if route_class is None:
+        return None
+    gate = admission_gates[route_class]
+    if not gate.enter():
+        metric_inc("admission_shed_total", route_class=route_class)
+        response = jsonify({'success': False, 'message': 'Server busy, try again'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    request.environ['roomfinder.admission_gate'] = gate
+    return None
+
+@app.errorhandler(PoolTimeout)
+def shed_on_pool_timeout(e):
+    response = jsonify({'success': False, 'message': 'Server busy, try again'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@app.errorhandler(HTTPException)
+def batch_item_http_error(e):
+    # A /batch sub-response is embedded in JSON, so give it a JSON body; other requests get the default page
+    if request.environ.get('roomfinder.batch_item'):
+        return jsonify({'success': False, 'message': e.description}), e.code
+    return e
+
+@app.teardown_request
+def release_admission(exc=None):
+    # Kept in the WSGI environ rather than g: /batch sub-requests share the outer app context
+    gate = request.environ.pop('roomfinder.admission_gate', None)
+    if gate is not None:
+        gate.leave()
+
+@app.after_request
+def pin_writer_to_primary(response):
+    user = getattr(request, 'user', None)
+    if (user and request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+            and request.endpoint not in READ_ENDPOINTS and response.status_code < 400):
+        # Read after the commit, so it is at or past the write; without a replica nothing reads it
+        written_lsn = db_pool.primary_wal_position() if db_pool.replica is not None else 0.0
+        read_pins.set(user['uid'], time.time() + READ_PIN_SECONDS, written_lsn,
+                      expired=lambda slot: slot[0] <= time.time())
+    return response
+
+# (encoding, body digest) -> compressed body, least recently used first
+compressed_bodies = OrderedDict()
+compressed_bodies_bytes = 0
+compressed_bodies_lock = threading.Lock()
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    global compressed_bodies_bytes
+    key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+    with compressed_bodies_lock:
+        compressed = compressed_bodies.get(key)
+        if compressed is not None:
+            compressed_bodies.move_to_end(key)
+            return compressed
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+    if len(compressed) > COMPRESS_CACHE_MAX_BYTES:
+        return compressed
+    with compressed_bodies_lock:
+        previous = compressed_bodies.pop(key, None)
+        if previous is not None:
+            compressed_bodies_bytes -= len(previous)
+        compressed_bodies[key] = compressed
+        compressed_bodies_bytes += len(compressed)
+        while compressed_bodies_bytes > COMPRESS_CACHE_MAX_BYTES:
+            compressed_bodies_bytes -= len(compressed_bodies.popitem(last=False)[1])
+    return compressed
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype.startswith('image/')):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = request.accept_encodings.best_match(["br", "gzip"] if brotli else ["gzip"])
+    if encoding is None:
+        return response
+
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 app.config['SWAGGER'] = {'title': 'Login API', 'uiversion': 3}
-swagger = Swagger(app)
-socketio = SocketIO(app,logger=True)
+if API_DOCS == "flasgger":
+    swagger = Swagger(app)
+elif API_DOCS == "static":
+    openapi_spec = None
+
+    @app.get('/apispec_1.json')
+    def static_openapi_spec():
+        global openapi_spec
+        if openapi_spec is None:
+            with open(OPENAPI_SPEC_PATH, 'rb') as spec_file:
+                openapi_spec = spec_file.read()
+        return Response(openapi_spec, mimetype='application/json')
+
+    @app.get('/apidocs/')
+    def static_api_docs():
+        return Response(
+            '<!DOCTYPE html><html><head><title>Login API</title>'
+            '<link rel="stylesheet" href="https://unpkg.com/swagger-ui-dist@5/swagger-ui.css"></head>'
+            '<body><div id="swagger-ui"></div>'
+            '<script src="https://unpkg.com/swagger-ui-dist@5/swagger-ui-bundle.js"></script>'
+            '<script>SwaggerUIBundle({url: "/apispec_1.json", dom_id: "#swagger-ui"});</script>'
+            '</body></html>',
+            mimetype='text/html'
+        )
+
+class PostgresManager(socketio_lib.PubSubManager):
+    """Socket.IO client manager that shares emits between workers via LISTEN/NOTIFY."""
+    name = 'postgres'
+
+    def __init__(self, dsn, channel='flask_socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.dsn = dsn
+        self.publish_conn = None
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    @staticmethod
+    def _chunks(payload):
+        """Split a payload too big for one NOTIFY into "chunk:<id>:<index>:<count>:<piece>" notifications."""
+        message_id = uuid.uuid4().hex
+        # Room for the header with up to 6-digit index and count
+        size = NOTIFY_MAX_PAYLOAD - len(f"chunk:{message_id}:") - 14
+        pieces = []
+        encoded = payload.encode()
+        while encoded:
+            # Cut on a character boundary: a trailing partial UTF-8 sequence goes to the next piece
+            piece = encoded[:size].decode("utf-8", "ignore")
+            pieces.append(piece)
+            encoded = encoded[len(piece.encode()):]
+        return [f"chunk:{message_id}:{index}:{len(pieces)}:{piece}" for index, piece in enumerate(pieces)]
+
+    def _publish(self, data):
+        payload = self.json.dumps(data)
+        notifications = [payload] if len(payload.encode()) <= NOTIFY_MAX_PAYLOAD else self._chunks(payload)
+        # One reconnect attempt: the publishing connection may have been dropped while idle.
+        for attempt in range(2):
+            try:
+                if self.publish_conn is None or self.publish_conn.closed:
+                    self.publish_conn = self._connect()
+                with self.publish_conn.cursor() as cur:
+                    # One statement is one transaction, so listeners get all chunks of a message or none
+                    cur.execute("SELECT pg_notify(%s, piece) FROM unnest(%s::text[]) AS piece;",
+                                (self.channel, notifications))
+                return
+            except psycopg2.OperationalError:
+                self.publish_conn = None
+                if attempt:
+                    raise
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                with conn.cursor() as cur:
+                    cur.execute(psycopg2.sql.SQL("LISTEN {};").format(psycopg2.sql.Identifier(self.channel)))
+                # message id -> {index: piece} for chunked messages still being received
+                pending = {}
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        payload = conn.notifies.pop(0).payload
+                        if not payload.startswith("chunk:"):
+                            yield payload
+                            continue
+                        _, message_id, index, count, piece = payload.split(":", 4)
+                        pieces = pending.setdefault(message_id, {})
+                        pieces[int(index)] = piece
+                        if len(pieces) == int(count):
+                            del pending[message_id]
+                            yield "".join(pieces[n] for n in range(int(count)))
+            except psycopg2.Error as e:
+                self._get_logger().error(f"Postgres pubsub listener error: {e}, reconnecting")
+                eventlet.sleep(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+if SOCKETIO_MESSAGE_QUEUE and SOCKETIO_MESSAGE_QUEUE.startswith(('postgres://', 'postgresql://')):
+    socketio = SocketIO(app, logger=True,
+                        client_manager=PostgresManager(SOCKETIO_MESSAGE_QUEUE, channel=SOCKETIO_CHANNEL))
+elif SOCKETIO_MESSAGE_QUEUE:
+    socketio = SocketIO(app, logger=True, message_queue=SOCKETIO_MESSAGE_QUEUE, channel=SOCKETIO_CHANNEL)
+else:
+    socketio = SocketIO(app, logger=True)
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        # /batch verified the token once for all of its sub-requests
+        if 'roomfinder.user' in request.environ:
+            request.user = request.environ['roomfinder.user']
+            return f(*args, **kwargs)
+
         token = None
         if 'Authorization' in request.headers:
             bearer = request.headers['Authorization']
@@ -52,6 +640,158 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+def rate_limit_exceeded(route_class: str):
+    """Take a route class token for the user (when behind token_required) or client IP.
+
+    Returns the 429 response to send if none is left, else None.
+    """
+    user = getattr(request, 'user', None)
+    identity = f"u{user['uid']}" if user else request.remote_addr
+    retry_after = take_token(f"{route_class}:{identity}", RATE_LIMITS[route_class])
+    if not retry_after:
+        return None
+    metric_inc("rate_limited_total", route_class=route_class)
+    response = jsonify({'success': False, 'message': 'Too many requests'})
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response, 429
+
+def rate_limited(route_class: str):
+    """Limit a route class per user (when behind token_required) or per client IP."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            return rate_limit_exceeded(route_class) or f(*args, **kwargs)
+        return decorated
+    return decorator
+
+def request_fingerprint() -> str:
+    """Hash of what the request asks for, to refuse reusing a key for a different request."""
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    if request.files or request.form:
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}\n".encode())
+        for name, upload in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"{name}:{upload.filename}\n".encode())
+            digest.update(upload.read())
+            upload.seek(0)
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+def claim_idempotency_key(uid: int, key: str, fingerprint: str):
+    """Try to claim (uid, key) in a short committed transaction.
+
+    Returns (True, None) when claimed, else (False, stored row or None if it just vanished).
+    Expired keys and claims abandoned for IDEMPOTENCY_CLAIM_TIMEOUT are cleared first.
+    """
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM idempotency_keys
+                WHERE uid = %s AND key = %s
+                  AND (created_at < now() - make_interval(secs => %s)
+                       OR (status_code IS NULL AND created_at < now() - make_interval(secs => %s)));
+            """, (uid, key, IDEMPOTENCY_TTL, IDEMPOTENCY_CLAIM_TIMEOUT))
+            cur.execute("""
+                INSERT INTO idempotency_keys (uid, key, endpoint, fingerprint)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (uid, key) DO NOTHING
+                RETURNING 1;
+            """, (uid, key, request.endpoint, fingerprint))
+            if cur.fetchone() is not None:
+                conn.commit()
+                return True, None
+            cur.execute("""
+                SELECT endpoint, fingerprint, status_code, content_type, body
+                FROM idempotency_keys
+                WHERE uid = %s AND key = %s;
+            """, (uid, key))
+            stored = cur.fetchone()
+            conn.commit()
+            return False, stored
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+def settle_idempotency_key(uid: int, key: str, response) -> None:
+    """Store the claimed request's response, or release the claim so a retry runs again."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            if (response is None or response.status_code >= 500 or response.status_code == 429
+                    or response.is_streamed):
+                cur.execute("""
+                    DELETE FROM idempotency_keys
+                    WHERE uid = %s AND key = %s AND status_code IS NULL;
+                """, (uid, key))
+                conn.commit()
+                return
+            cur.execute("""
+                UPDATE idempotency_keys
+                SET status_code = %s, content_type = %s, body = %s
+                WHERE uid = %s AND key = %s;
+            """, (response.status_code, response.content_type, psycopg2.Binary(response.get_data()), uid, key))
+            conn.commit()
+            cur.execute("DELETE FROM idempotency_keys WHERE created_at < now() - make_interval(secs => %s);",
+                        (IDEMPOTENCY_TTL,))
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+def idempotent(f):
+    """Replay the stored response for a repeated Idempotency-Key (use below token_required).
+
+    The key is claimed and the response stored in two short transactions, so no
+    connection is held while the view runs. A concurrent duplicate polls the row until
+    the response appears or IDEMPOTENCY_WAIT passes. Server errors and 429s release
+    the claim and a retry runs again. Put it above rate_limited, so a replay costs no token.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return f(*args, **kwargs)
+        if not key or len(key) > 255:
+            return jsonify({'success': False, 'message': 'Invalid Idempotency-Key'}), 400
+
+        uid = request.user['uid']
+        fingerprint = request_fingerprint()
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT
+        while True:
+            claimed, stored = claim_idempotency_key(uid, key, fingerprint)
+            if claimed:
+                break
+            if stored is None:
+                # The first request released its claim; try to take it
+                continue
+            endpoint, stored_fingerprint, status_code, content_type, body = stored
+            if endpoint != request.endpoint or stored_fingerprint != fingerprint:
+                return jsonify({'success': False,
+                                'message': 'Idempotency-Key was already used for a different request'}), 422
+            if status_code is not None:
+                metric_inc("idempotent_replays_total", endpoint=endpoint)
+                response = Response(bytes(body), status=status_code, content_type=content_type)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            if time.monotonic() >= deadline:
+                return jsonify({'success': False,
+                                'message': 'A request with this Idempotency-Key is still in progress'}), 409
+            socketio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+        response = None
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+            return response
+        finally:
+            settle_idempotency_key(uid, key, response)
+    return decorated
+
 @socketio.on("connect")
 def handle_connect(*args) -> bool | None:
     current_app.logger.debug(f"WS connect: args={request.args}")
@@ -65,14 +805,661 @@ def handle_connect(*args) -> bool | None:
     join_room(f"user:{uid}")
     current_app.logger.debug(f"Joined room user:{uid}")
 
-def push_to_owner(owner_id: int, text: str) -> None:
+def push_to_owner(owner_id: int, text: str, digest: list | None = None) -> None:
     current_app.logger.debug(f"push_to_owner → room=user:{owner_id}, message={text}")
+    payload = {"message": text}
+    if digest is not None:
+        payload["digest"] = digest
     socketio.emit(
         "accommodation_liked",
-        {"message": text},
+        payload,
         room=f"user:{owner_id}",
     )
 
+# owner_id -> aid -> {'name': acc_name, 'likers': {liker_email: 'liked' | 'unliked'}}
+pending_like_notifications = {}
+pending_like_lock = threading.Lock()
+like_flusher_pid = None
+
+def queue_like_notification(owner_id: int, aid: int, acc_name: str, liker_email: str, action: str) -> None:
+    global like_flusher_pid
+    if NOTIFY_FLUSH_INTERVAL <= 0:
+        push_to_owner(owner_id, f'Your accommodation "{acc_name}" was {action} by {liker_email}')
+        return
+
+    with pending_like_lock:
+        entry = pending_like_notifications.setdefault(owner_id, {}).setdefault(
+            aid, {'name': acc_name, 'likers': {}})
+        entry['name'] = acc_name
+        # A like followed by an unlike (or vice versa) from the same user cancels out.
+        if liker_email in entry['likers']:
+            del entry['likers'][liker_email]
+        else:
+            entry['likers'][liker_email] = action
+
+        if like_flusher_pid != os.getpid():
+            like_flusher_pid = os.getpid()
+            socketio.start_background_task(like_notification_flusher)
+
+def like_notification_flusher() -> None:
+    while True:
+        socketio.sleep(NOTIFY_FLUSH_INTERVAL)
+        try:
+            flush_like_notifications()
+        except Exception as e:
+            app.logger.error(f"Like notification flush error: {e}")
+
+def flush_like_notifications() -> None:
+    global pending_like_notifications
+    with pending_like_lock:
+        batch, pending_like_notifications = pending_like_notifications, {}
+
+    with app.app_context():
+        for owner_id, accommodations in batch.items():
+            digest = []
+            single = None
+            for aid, entry in accommodations.items():
+                likes = [email for email, action in entry['likers'].items() if action == 'liked']
+                unlikes = [email for email, action in entry['likers'].items() if action == 'unliked']
+                if not likes and not unlikes:
+                    continue
+                digest.append({'aid': aid, 'name': entry['name'], 'likes': len(likes), 'unlikes': len(unlikes)})
+                if len(likes) + len(unlikes) == 1:
+                    action, email = ('liked', likes[0]) if likes else ('unliked', unlikes[0])
+                    single = f'Your accommodation "{entry["name"]}" was {action} by {email}'
+
+            if not digest:
+                continue
+            if len(digest) == 1 and single:
+                text = single
+            else:
+                parts = []
+                for item in digest:
+                    if item['likes']:
+                        parts.append(f'{item["likes"]} new like{"s" if item["likes"] != 1 else ""} on {item["name"]}')
+                    if item['unlikes']:
+                        parts.append(f'{item["unlikes"]} unlike{"s" if item["unlikes"] != 1 else ""} on {item["name"]}')
+                text = "; ".join(parts)
+            push_to_owner(owner_id, text, digest)
+
+def notify_accommodations_changed(cursor, aids) -> None:
+    """Announce changed accommodations to every worker's caches once the transaction commits."""
+    payloads = []
+    for aid in (str(int(aid)) for aid in aids if aid is not None):
+        # Ids are independent, so a long list just goes out as several notifications
+        if payloads and len(payloads[-1]) + 1 + len(aid) <= NOTIFY_MAX_PAYLOAD:
+            payloads[-1] += f",{aid}"
+        else:
+            payloads.append(aid)
+    for payload in payloads:
+        cursor.execute("SELECT pg_notify(%s, %s);", (ACCOMMODATION_CHANGED_CHANNEL, payload))
+
+def drop_cached_accommodations(aids) -> None:
+    global search_cache_invalidated_at
+    with search_cache_lock:
+        search_cache_invalidated_at = time.monotonic()
+        for aid in aids:
+            detail_cache.pop(int(aid), None)
+            for key in list(search_cache_keys_by_aid.get(int(aid), ())):
+                evict_search_key(key)
+
+def accommodation_change_listener() -> None:
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(DATABASE_URL)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {ACCOMMODATION_CHANGED_CHANNEL};")
+            # Anything cached before the listener was up may have missed a change
+            with search_cache_lock:
+                search_cache.clear()
+                search_cache_keys_by_aid.clear()
+                detail_cache.clear()
+            while True:
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    payload = conn.notifies.pop(0).payload
+                    drop_cached_accommodations(int(aid) for aid in payload.split(",") if aid)
+        except Exception as e:
+            app.logger.error(f"Accommodation change listener error: {e}, reconnecting")
+            eventlet.sleep(1)
+        finally:
+            if conn is not None:
+                conn.close()
+
+# normalized search tuple -> (expires_at, ordered aids, next_cursor)
+search_cache = {}
+search_cache_keys_by_aid = {}
+search_cache_lock = threading.Lock()
+search_cache_invalidated_at = 0.0
+change_listener_pid = None
+# aid -> (expires_at, day it was computed for, detail payload without per-user fields), LRU order
+detail_cache = OrderedDict()
+
+def ensure_change_listener() -> None:
+    global change_listener_pid
+    if change_listener_pid != os.getpid():
+        change_listener_pid = os.getpid()
+        socketio.start_background_task(accommodation_change_listener)
+
+def evict_search_key(key) -> None:
+    """Drop one cached search and its entries in the per-aid index; call with search_cache_lock held."""
+    entry = search_cache.pop(key, None)
+    if entry is None:
+        return
+    for aid in entry[1]:
+        keys = search_cache_keys_by_aid.get(aid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del search_cache_keys_by_aid[aid]
+
+def search_cache_get(key):
+    if SEARCH_CACHE_TTL <= 0:
+        return None
+    ensure_change_listener()
+    entry = search_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        with search_cache_lock:
+            evict_search_key(key)
+        return None
+    return entry[1], entry[2]
+
+def search_cache_put(key, aids: list[int], next_cursor, started_at: float) -> None:
+    if SEARCH_CACHE_TTL <= 0:
+        return
+    now = time.monotonic()
+    with search_cache_lock:
+        # A change arrived while the query ran; the result may already be stale
+        if search_cache_invalidated_at >= started_at:
+            return
+        if len(search_cache) >= SEARCH_CACHE_MAX_ENTRIES:
+            for old_key in [k for k, v in search_cache.items() if v[0] < now] or list(search_cache)[:len(search_cache) // 10 + 1]:
+                evict_search_key(old_key)
+        evict_search_key(key)
+        search_cache[key] = (now + SEARCH_CACHE_TTL, aids, next_cursor)
+        for aid in aids:
+            search_cache_keys_by_aid.setdefault(aid, set()).add(key)
+
+job_handlers = {}
+job_workers_pid = None
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying cannot help; the job is dead-lettered at once."""
+
+def job_handler(kind: str, on_dead=None):
+    """Register f(payload) for jobs of this kind; on_dead(payload, error) runs once it is dead-lettered."""
+    def decorator(f):
+        job_handlers[kind] = (f, on_dead)
+        return f
+    return decorator
+
+def enqueue_job(cursor, kind: str, payload: dict, delay: float = 0, max_attempts: int = 5,
+                lease_seconds: float | None = None) -> None:
+    """Add a job in the caller's transaction, so it exists only if the caller commits.
+
+    lease_seconds overrides JOB_LEASE_SECONDS for jobs that legitimately run longer.
+    """
+    cursor.execute("""
+        INSERT INTO jobs (kind, payload, max_attempts, run_at, lease_seconds)
+        VALUES (%s, %s, %s, now() + make_interval(secs => %s), %s);
+    """, (kind, json.dumps(payload), max_attempts, delay, lease_seconds))
+
+def ensure_job_workers() -> None:
+    global job_workers_pid
+    if job_workers_pid != os.getpid():
+        job_workers_pid = os.getpid()
+        for _ in range(JOB_WORKERS):
+            socketio.start_background_task(job_worker)
+
+def run_next_job() -> bool:
+    """Claim, run and settle one due job. Returns False when none is due.
+
+    Claiming leases the job for its lease_seconds (default JOB_LEASE_SECONDS) in its own
+    short transaction, so no connection is held while the handler runs; if the process
+    dies, the lease expires and another worker picks the job up again (handlers must be
+    idempotent).
+    """
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE jobs SET attempts = attempts + 1,
+                                run_at = now() + make_interval(secs => COALESCE(lease_seconds, %s))
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'pending' AND run_at <= now()
+                    ORDER BY run_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, kind, payload, attempts, max_attempts;
+            """, (JOB_LEASE_SECONDS,))
+            job = cur.fetchone()
+            conn.commit()
+    finally:
+        db_pool.putconn(conn)
+    if job is None:
+        return False
+
+    job_id, kind, payload, attempts, max_attempts = job
+    handler, on_dead = job_handlers.get(kind, (None, None))
+    started_at = time.monotonic()
+    error, permanent = None, False
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job kind {kind!r}")
+        with app.app_context():
+            handler(payload)
+    except PermanentJobError as e:
+        error, permanent = str(e), True
+    except Exception as e:
+        error = str(e)
+    metric_inc("jobs_duration_seconds_total", time.monotonic() - started_at, kind=kind)
+
+    dead = False
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            if error is None:
+                cur.execute("DELETE FROM jobs WHERE id = %s;", (job_id,))
+                metric_inc("jobs_completed_total", kind=kind)
+            elif permanent or attempts >= max_attempts:
+                cur.execute("UPDATE jobs SET status = 'dead', last_error = %s WHERE id = %s;", (error, job_id))
+                metric_inc("jobs_dead_total", kind=kind)
+                app.logger.error(f"Job {job_id} ({kind}) dead-lettered after {attempts} attempt(s): {error}")
+                dead = True
+            else:
+                backoff = min(JOB_BACKOFF_BASE * 2 ** (attempts - 1), JOB_BACKOFF_MAX)
+                cur.execute("""
+                    UPDATE jobs SET run_at = now() + make_interval(secs => %s), last_error = %s
+                    WHERE id = %s;
+                """, (backoff, error, job_id))
+                metric_inc("jobs_retried_total", kind=kind)
+            conn.commit()
+    finally:
+        db_pool.putconn(conn)
+
+    if dead and on_dead is not None:
+        try:
+            with app.app_context():
+                on_dead(payload, error)
+        except Exception as e:
+            app.logger.error(f"Job {job_id} ({kind}) dead-letter hook error: {e}")
+    return True
+
+def job_worker() -> None:
+    while True:
+        try:
+            if run_next_job():
+                continue
+            conn = db_pool.getconn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending';")
+                    metric_set("jobs_pending", cur.fetchone()[0])
+                conn.rollback()
+            finally:
+                db_pool.putconn(conn)
+        except Exception as e:
+            app.logger.error(f"Job worker error: {e}")
+        socketio.sleep(JOB_POLL_INTERVAL)
+
+def geocoding_failed(payload: dict, error: str) -> None:
+    """Flag the listing so its owner sees why it is still hidden; a new address retries."""
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE accommodations SET geocode_status = 'failed'
+                WHERE aid = %s AND address = %s AND geocode_status = 'pending'
+                RETURNING aid;
+            """, (payload["aid"], payload["address"]))
+            if cur.fetchone():
+                bump_list_versions(cur, aids=[payload["aid"]])
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+@job_handler("geocode_accommodation", on_dead=geocoding_failed)
+def geocode_accommodation_job(payload: dict) -> None:
+    wait_for_geocode_slot()
+    latitude, longitude, city, country = geocode_address_full(payload["address"])
+    if not all([latitude, longitude, city, country]):
+        raise PermanentJobError(f"Address could not be geocoded: {payload['address']}")
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            # Skip if the owner changed the address in the meantime; that edit geocodes itself
+            cur.execute("""
+                UPDATE accommodations
+                SET latitude = %s, longitude = %s, location_city = %s, location_country = %s, geocode_status = 'done'
+                WHERE aid = %s AND address = %s
+                RETURNING aid;
+            """, (latitude, longitude, city, country, payload["aid"], payload["address"]))
+            if cur.fetchone():
+                bump_list_versions(cur, aids=[payload["aid"]])
+                notify_accommodations_changed(cur, [payload["aid"]])
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+    drop_cached_accommodations([payload["aid"]])
+
+def bulk_import_failed(payload: dict, error: str) -> None:
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE bulk_imports
+                SET status = 'failed', message = %s, rows = NULL, finished_at = now()
+                WHERE id = %s AND status = 'pending';
+            """, (error, payload["import_id"]))
+            cur.execute("DELETE FROM bulk_import_images WHERE import_id = %s;", (payload["import_id"],))
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+@job_handler("bulk_import", on_dead=bulk_import_failed)
+def bulk_import_job(payload: dict) -> None:
+    """Geocode and insert the validated rows of one bulk import, then store its report.
+
+    The import and its report commit together, so a retried job either finds the import
+    done or redoes all of it. No connection is held while geocoding. Images are copied
+    from the staged bulk_import_images rows inside the database and then dropped.
+    """
+    import_id = payload["import_id"]
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT uid, rows, errors FROM bulk_imports
+                WHERE id = %s AND status = 'pending';
+            """, (import_id,))
+            pending = cur.fetchone()
+        conn.rollback()
+    finally:
+        db_pool.putconn(conn)
+    if pending is None:
+        return
+    uid, rows, errors = pending
+
+    # Geocode the distinct addresses, paced host-wide
+    geocoded = geocode_addresses(fields["address"] for _, fields in rows)
+    valid_rows = []
+    for row_no, fields in rows:
+        latitude, longitude, city, country = geocoded[fields["address"]]
+        if not all([latitude, longitude, city, country]):
+            errors.append({'row': row_no, 'message': 'Address could not be geocoded'})
+            continue
+        fields.update(latitude=latitude, longitude=longitude, city=city, country=country)
+        valid_rows.append((row_no, fields))
+
+    def staging_chunks():
+        for row_no, fields in valid_rows:
+            line = io.StringIO()
+            csv.writer(line).writerow([
+                row_no, fields["name"], fields["city"], fields["country"], fields["guests"],
+                fields["latitude"], fields["longitude"], fields["price"], fields["description"], fields["iban"],
+                fields["address"]
+            ])
+            yield line.getvalue().encode("utf-8")
+
+    aids = {}
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            if valid_rows:
+                # Stream the listings into a staging table and insert them in one statement
+                cur.execute("""
+                    CREATE TEMP TABLE accommodation_import (
+                        row_no integer, name text, location_city text, location_country text,
+                        max_guests integer, latitude double precision, longitude double precision,
+                        price_per_night numeric, description text, iban text, address text, aid integer
+                    ) ON COMMIT DROP;
+                """)
+                cur.copy_expert(
+                    "COPY accommodation_import (row_no, name, location_city, location_country, max_guests, "
+                    "latitude, longitude, price_per_night, description, iban, address) FROM STDIN WITH (FORMAT csv)",
+                    IterStream(staging_chunks())
+                )
+                cur.execute("UPDATE accommodation_import SET aid = nextval(pg_get_serial_sequence('accommodations', 'aid'));")
+                cur.execute("""
+                    INSERT INTO accommodations
+                    (aid, name, location_city, location_country, owner_id, max_guests, latitude, longitude,
+                     price_per_night, description, iban, address, search_vector)
+                    SELECT aid, name, location_city, location_country, %s, max_guests, latitude, longitude,
+                           price_per_night, description, iban, address,
+                           setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                           setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+                    FROM accommodation_import;
+                """, (uid,))
+                cur.execute("SELECT row_no, aid FROM accommodation_import ORDER BY row_no;")
+                aids = dict(cur.fetchall())
+
+                # Each listing's images in row order, copied from the staged ones
+                pictures = [(aids[row_no], name) for row_no, fields in valid_rows for name in fields["images"]]
+                cur.execute("""
+                    INSERT INTO pictures (aid, image, sha256)
+                    SELECT p.aid, b.image, b.sha256
+                    FROM unnest(%s::integer[], %s::text[]) WITH ORDINALITY AS p(aid, name, position)
+                    JOIN bulk_import_images b ON b.import_id = %s AND b.name = p.name
+                    ORDER BY p.position;
+                """, ([aid for aid, _ in pictures], [name for _, name in pictures], import_id))
+                cur.execute("UPDATE users SET role = 'owner'::user_role WHERE uid = %s;", (uid,))
+                bump_list_versions(cur, uids=[uid])
+
+            errors.sort(key=lambda error: error['row'])
+            imported = [{'row': row_no, 'aid': aid} for row_no, aid in sorted(aids.items())]
+            cur.execute("""
+                UPDATE bulk_imports
+                SET status = 'done', imported = %s, errors = %s, rows = NULL, finished_at = now()
+                WHERE id = %s;
+            """, (json.dumps(imported), json.dumps(errors), import_id))
+            cur.execute("DELETE FROM bulk_import_images WHERE import_id = %s;", (import_id,))
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+purger_pid = None
+
+def ensure_accommodation_purger() -> None:
+    global purger_pid
+    if purger_pid != os.getpid():
+        purger_pid = os.getpid()
+        socketio.start_background_task(accommodation_purger)
+
+def purge_deleted_accommodation_batch(conn) -> bool:
+    """Remove one batch of a soft-deleted accommodation's pictures, likes or future stays.
+
+    Pictures go first (they are the bulk of the data), then likes, then reservations
+    from today on with their occupancy nights. Past reservations are history and keep
+    the tombstone row; once nothing is left it is marked purged. Returns False when
+    there is no work. Workers running this concurrently take different accommodations.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT aid FROM accommodations
+            WHERE deleted_at IS NOT NULL AND purged_at IS NULL
+            ORDER BY deleted_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED;
+        """)
+        row = cur.fetchone()
+        if row is None:
+            conn.rollback()
+            return False
+        aid = row[0]
+
+        cur.execute("""
+            DELETE FROM pictures WHERE pid IN (
+                SELECT pid FROM pictures WHERE aid = %s LIMIT %s
+            );
+        """, (aid, PURGE_BATCH_SIZE))
+        if cur.rowcount == 0:
+            cur.execute("""
+                DELETE FROM liked WHERE aid = %s AND uid IN (
+                    SELECT uid FROM liked WHERE aid = %s LIMIT %s
+                );
+            """, (aid, aid, PURGE_BATCH_SIZE))
+        if cur.rowcount == 0:
+            cur.execute("""
+                WITH r AS (
+                    DELETE FROM reservations WHERE rid IN (
+                        SELECT rid FROM reservations WHERE aid = %s AND "From" >= %s LIMIT %s
+                    )
+                    RETURNING rid
+                )
+                DELETE FROM occupancy_nights WHERE rid IN (SELECT rid FROM r);
+            """, (aid, date.today(), PURGE_BATCH_SIZE))
+            cur.execute("""
+                SELECT EXISTS (SELECT 1 FROM reservations WHERE aid = %s AND "From" >= %s);
+            """, (aid, date.today()))
+            if not cur.fetchone()[0]:
+                cur.execute("UPDATE accommodations SET purged_at = now() WHERE aid = %s;", (aid,))
+                metric_inc("accommodations_purged_total")
+    conn.commit()
+    return True
+
+def accommodation_purger() -> None:
+    while True:
+        busy = False
+        conn = db_pool.getconn()
+        try:
+            busy = purge_deleted_accommodation_batch(conn)
+        except Exception as e:
+            conn.rollback()
+            app.logger.error(f"Accommodation purge error: {e}")
+        finally:
+            db_pool.putconn(conn)
+        socketio.sleep(PURGE_BATCH_PAUSE if busy else PURGE_IDLE_INTERVAL)
+
+def bump_list_versions(cursor, uids=(), aids=()) -> None:
+    """Invalidate the list ETags of the given users and of everyone whose lists show the given aids.
+
+    Call in the writing transaction, so a client never gets a 304 for a list that changed.
+    """
+    cursor.execute("""
+        UPDATE users SET list_version = list_version + 1
+        WHERE uid = ANY(%(uids)s)
+           OR uid IN (SELECT owner_id FROM accommodations WHERE aid = ANY(%(aids)s))
+           OR uid IN (SELECT reserved_by FROM reservations WHERE aid = ANY(%(aids)s))
+           OR uid IN (SELECT uid FROM liked WHERE aid = ANY(%(aids)s));
+    """, {"uids": list(uids), "aids": list(aids)})
+
+def list_etag(per_day: bool = False):
+    """Answer If-None-Match with 304 from the caller's list_version (use below token_required).
+
+    The version is read before the list itself, so a concurrent write can only make the
+    ETag older than the data (one extra refresh), never newer. per_day adds today's date
+    for lists that change with it.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            conn = db_pool.getconn()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT list_version FROM users WHERE uid = %s;", (request.user['uid'],))
+                    row = cursor.fetchone()
+                conn.rollback()
+            finally:
+                db_pool.putconn(conn)
+            if row is None:
+                return f(*args, **kwargs)
+
+            tag = f"{request.endpoint}.{request.user['uid']}.{row[0]}"
+            if per_day:
+                tag += f".{date.today().isoformat()}"
+            if request.if_none_match.contains_weak(tag):
+                metric_inc("etag_not_modified_total", endpoint=request.endpoint)
+                response = Response(status=304)
+                response.set_etag(tag, weak=True)
+                return response
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(tag, weak=True)
+            return response
+        return decorated
+    return decorator
+
+def wants_stream() -> bool:
+    return request.args.get("stream", "").lower() in ("1", "true", "yes")
+
+def stream_json_rows(query: str, params: tuple, row_to_item, prefix: str = "[", suffix: str = "]") -> Response:
+    """Stream query rows as a JSON array, fetched through a named server-side cursor.
+
+    Only STREAM_ITERSIZE rows are held in memory at a time, regardless of the result size.
+    The query runs and the first batch is fetched before the 200 goes out, so a failing
+    query still gets a proper 500 instead of a truncated body.
+    """
+    conn = db_pool.getconn()
+    cursor = None
+    released = False
+
+    def release():
+        # Runs from the generator and from response.close(); whichever comes first wins
+        nonlocal released
+        if released:
+            return
+        released = True
+        try:
+            if cursor is not None:
+                cursor.close()
+            conn.rollback()
+        except Exception as e:
+            # The connection is unusable; close it instead of handing it to the next request
+            print("Stream rows cleanup error:", e)
+            db_pool.putconn(conn, close=True)
+        else:
+            db_pool.putconn(conn)
+
+    try:
+        cursor = conn.cursor(name="stream_json_rows")
+        cursor.execute(query, params)
+        first = cursor.fetchmany(STREAM_ITERSIZE)
+    except Exception as e:
+        print("Stream rows error:", e)
+        release()
+        return jsonify({'success': False, 'message': 'Server error', 'error': str(e)}), 500
+
+    def generate():
+        try:
+            yield prefix
+            rows, separator = first, ""
+            while rows:
+                chunk = []
+                for row in rows:
+                    chunk.append(separator + json.dumps(row_to_item(row), default=str))
+                    separator = ","
+                yield "".join(chunk)
+                rows = cursor.fetchmany(STREAM_ITERSIZE) if len(rows) == STREAM_ITERSIZE else []
+            yield suffix
+        finally:
+            release()
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    response.call_on_close(release)
+    return response
+
 @app.get("/default")
 @swag_from({
     'tags': ['Test'],
@@ -143,6 +1530,7 @@ def default():
         }
     }
 })
+@rate_limited("auth")
 def login():
     data = request.json
     email = data.get('email')
@@ -151,7 +1539,7 @@ def login():
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT uid, password, role FROM users WHERE email = %s;", (email,))
+            cur.execute(USER_LOGIN_SQL, (email,))
             user = cur.fetchone()
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
@@ -216,18 +1604,21 @@ def delete_accommodation(aid):
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cursor:
-            # Skontroluj, či používateľ je vlastníkom ubytovania
-            cursor.execute("SELECT * FROM accommodations WHERE aid = %s AND owner_id = %s;", (aid, uid))
-            acc = cursor.fetchone()
-
-            if not acc:
+            # Označ ubytovanie ako zmazané; obrázky, lajky a budúce rezervácie odstráni purger
+            cursor.execute("""
+                UPDATE accommodations SET deleted_at = now()
+                WHERE aid = %s AND owner_id = %s AND deleted_at IS NULL
+                RETURNING aid;
+            """, (aid, uid))
+            if not cursor.fetchone():
+                conn.rollback()
                 return jsonify({'success': False, 'message': 'Accommodation not found or unauthorized'}), 404
 
-            # Najprv vymaž obrázky
-            cursor.execute("DELETE FROM pictures WHERE aid = %s;", (aid,))
-            # Potom vymaž ubytovanie
-            cursor.execute("DELETE FROM accommodations WHERE aid = %s;", (aid,))
+            bump_list_versions(cursor, aids=[aid])
+            notify_accommodations_changed(cursor, [aid])
             conn.commit()
+        drop_cached_accommodations([aid])
+        ensure_accommodation_purger()
 
         return jsonify({'success': True, 'message': f'Accommodation {aid} deleted'}), 200
 
@@ -282,6 +1673,7 @@ def delete_accommodation(aid):
         }
     }
 })
+@rate_limited("auth")
 def register():
     data = request.json
     email = data.get('email')
@@ -325,7 +1717,9 @@ def geocode_address_full(address):
         'User-Agent': 'mtaa-app/1.0'
     }
 
-    response = requests.get(url, params=params, headers=headers)
+    response = requests.get(url, params=params, headers=headers, timeout=GEOCODE_TIMEOUT)
+    # An outage or throttling is not an answer about the address
+    response.raise_for_status()
     data = response.json()
 
     if data:
@@ -338,12 +1732,69 @@ def geocode_address_full(address):
     else:
         return None, None, "", ""
 
+def wait_for_geocode_slot() -> None:
+    """Block until the host-wide Nominatim budget (GEOCODE_RATE_PER_SEC) allows one more request.
+
+    The bucket lives in SharedSlots, so background geocoding in every worker process and
+    job worker shares it instead of each pacing itself.
+    """
+    limit = f"1/{1 / GEOCODE_RATE_PER_SEC}"
+    while True:
+        wait = take_token("nominatim", limit)
+        if not wait:
+            return
+        socketio.sleep(wait)
+
+def geocode_addresses(addresses) -> dict:
+    """Geocode many addresses, up to GEOCODE_BATCH_SIZE at a time, paced by wait_for_geocode_slot.
+
+    Addresses Nominatim does not know map to (None, None, "", ""). Network errors,
+    timeouts and error responses propagate, so the calling job is retried with backoff
+    instead of reporting good addresses as ungeocodable.
+    """
+    def geocode(address):
+        wait_for_geocode_slot()
+        return address, geocode_address_full(address)
+
+    pool_ = eventlet.GreenPool(max(1, GEOCODE_BATCH_SIZE))
+    return dict(pool_.imap(geocode, dict.fromkeys(addresses)))
+
+class IterStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks, used to stream COPY FROM STDIN."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            try:
+                self.pending = next(self.chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
 @app.route('/add-accommodation', methods=['POST'])
 @swag_from({
     'tags': ['Accommodations'],
     'summary': 'Add a new accommodation',
-    'description': 'Adds a new accommodation with at least 3 images. Location data is auto-filled by geocoding the address. **Requires a valid JWT in the `Authorization` header.**',
+    'description': 'Adds a new accommodation with at least 3 images. Location data is filled in shortly after by a background job that geocodes the address; until then the listing is hidden from other users, and GET /my-accommodations shows its `geocoding` status (`pending`, `failed` or `done`). **Requires a valid JWT in the `Authorization` header.**',
     'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'Idempotency-Key',
+            'in': 'header',
+            'type': 'string',
+            'required': False,
+            'description': 'Client-chosen key; retries with the same key replay the first response instead of repeating the request'
+        }
+    ],
     'requestBody': {
         'required': True,
         'content': {
@@ -397,7 +1848,8 @@ def geocode_address_full(address):
                     'example': {
                         'success': True,
                         'message': 'Accommodation added',
-                        'aid': 1
+                        'aid': 1,
+                        'geocoding': 'pending'
                     }
                 }
             }
@@ -428,6 +1880,8 @@ def geocode_address_full(address):
     }
 })
 @token_required
+@idempotent
+@rate_limited("upload")
 def add_accommodation():
     print("[DEBUG] add_accommodation() called for user ID:", request.user.get('uid'))
     conn = db_pool.getconn()
@@ -444,10 +1898,7 @@ def add_accommodation():
         print(f"[DEBUG] Form inputs - name: {name}, guests: {max_guests}, price: {price}, address: {address}, iban: {iban}")
         print(f"[DEBUG] Number of images received: {len(images)}")
 
-        latitude, longitude, location_city, location_country = geocode_address_full(address)
-        print(f"[DEBUG] Geocoded address '{address}' to: latitude={latitude}, longitude={longitude}, city={location_city}, country={location_country}")
-
-        if not all([name, location_city, location_country, max_guests, price, latitude, longitude, description, iban]):
+        if not all([name, address, max_guests, price, description, iban]):
             print("[DEBUG] Validation failed - missing one or more required fields")
             return jsonify({'success': False, 'message': 'Missing required fields'}), 400
 
@@ -459,26 +1910,32 @@ def add_accommodation():
             print("[DEBUG] Executing INSERT into accommodations table")
             cur.execute("""
                 INSERT INTO accommodations
-                (name, location_city, location_country, owner_id, max_guests, latitude, longitude, price_per_night, description, iban)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                (name, location_city, location_country, owner_id, max_guests, price_per_night, description, iban, address,
+                 geocode_status, search_vector)
+                VALUES (%s, '', '', %s, %s, %s, %s, %s, %s, 'pending', """ + SEARCH_VECTOR_SQL + """)
                 RETURNING aid;
             """, (
-                name, location_city, location_country,
-                request.user['uid'], max_guests, latitude, longitude,
-                price, description, iban
+                name, request.user['uid'], max_guests,
+                price, description, iban, address, name, description
             ))
             aid = cur.fetchone()[0]
             print(f"[DEBUG] New accommodation ID: {aid}")
+            # Location is filled in by the geocode job once the listing is committed
+            enqueue_job(cur, "geocode_accommodation", {"aid": aid, "address": address})
+            bump_list_versions(cur, uids=[request.user['uid']])
 
             for img in images:
                 print(f"[DEBUG] Inserting images for accommodation ID {aid})")
-                cur.execute("INSERT INTO pictures (aid, image) VALUES (%s, %s);", (aid, psycopg2.Binary(img.read())))
+                content = img.read()
+                cur.execute("INSERT INTO pictures (aid, image, sha256) VALUES (%s, %s, %s);",
+                            (aid, psycopg2.Binary(content), hashlib.sha256(content).hexdigest()))
 
             cur.execute("UPDATE users SET role = 'owner'::user_role WHERE uid = %s;", (request.user['uid'],))
             conn.commit()
             print("[DEBUG] Transaction committed successfully")
+        ensure_job_workers()
 
-        return jsonify({'success': True, 'message': 'Accommodation added', 'aid': aid}), 201
+        return jsonify({'success': True, 'message': 'Accommodation added', 'aid': aid, 'geocoding': 'pending'}), 201
     except Exception as e:
         print("Accommodation upload error:", e)
         try:
@@ -491,6 +1948,256 @@ def add_accommodation():
         db_pool.putconn(conn)
         print("[DEBUG] Returned DB connection to the pool")
 
+def read_import_rows(listings_file):
+    """Yield (row number, dict) from an uploaded JSONL or CSV listings file."""
+    text = io.TextIOWrapper(listings_file.stream, encoding="utf-8")
+    if (listings_file.filename or "").lower().endswith(".csv") or listings_file.mimetype == "text/csv":
+        for row_no, row in enumerate(csv.DictReader(text), 1):
+            images = row.get("images") or ""
+            row["images"] = [name.strip() for name in images.split(";") if name.strip()]
+            yield row_no, row
+    else:
+        for row_no, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                yield row_no, None
+                continue
+            if isinstance(row.get("images"), str):
+                row["images"] = [name.strip() for name in row["images"].split(";") if name.strip()]
+            yield row_no, row
+
+@app.route('/bulk-import-accommodations', methods=['POST'])
+@swag_from({
+    'tags': ['Accommodations'],
+    'summary': 'Bulk import accommodations',
+    'description': (
+        'Imports many accommodations at once from a JSONL or CSV file plus a ZIP archive with their images. '
+        'Every row needs name, guests, price, address, description, iban and images (at least 3 file names '
+        'from the archive; separated by ";" in CSV). Rows are validated right away; geocoding (paced to '
+        'the Nominatim rate limit) and the insert run in the background. The response carries an import '
+        'id; poll GET /bulk-import-accommodations/<import_id> for the per-row report. Invalid rows are '
+        'reported in errors and skipped; valid rows are imported. '
+        '**Requires a valid JWT in the `Authorization` header.**'
+    ),
+    'security': [{'BearerAuth': []}],
+    'requestBody': {
+        'required': True,
+        'content': {
+            'multipart/form-data': {
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'listings': {
+                            'type': 'string',
+                            'format': 'binary',
+                            'description': 'JSONL (one listing per line) or CSV file'
+                        },
+                        'images': {
+                            'type': 'string',
+                            'format': 'binary',
+                            'description': 'ZIP archive with the images referenced by the listings'
+                        }
+                    },
+                    'required': ['listings', 'images']
+                }
+            }
+        }
+    },
+    'responses': {
+        202: {
+            'description': 'Import accepted; poll status_url for the result',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'import_id': 7,
+                        'status': 'pending',
+                        'status_url': '/bulk-import-accommodations/7'
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Missing files, unreadable archive or too many rows',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': False,
+                        'message': 'Listings file and image archive are required'
+                    }
+                }
+            }
+        },
+        500: {
+            'description': 'Server error'
+        }
+    }
+})
+@token_required
+@rate_limited("upload")
+def bulk_import_accommodations():
+    uid = request.user['uid']
+    listings_file = request.files.get("listings")
+    archive_file = request.files.get("images")
+
+    if not listings_file or not archive_file:
+        return jsonify({'success': False, 'message': 'Listings file and image archive are required'}), 400
+
+    try:
+        archive = zipfile.ZipFile(archive_file.stream)
+    except zipfile.BadZipFile:
+        return jsonify({'success': False, 'message': 'Image archive is not a valid ZIP file'}), 400
+    archive_names = {name: name for name in archive.namelist() if not name.endswith("/")}
+    for name in list(archive_names):
+        archive_names.setdefault(os.path.basename(name), name)
+
+    # 1. Validate rows; everything that fails is reported, not fatal
+    rows, errors = [], []
+    try:
+        for row_no, row in read_import_rows(listings_file):
+            if row_no > BULK_IMPORT_MAX_ROWS:
+                return jsonify({'success': False, 'message': f'At most {BULK_IMPORT_MAX_ROWS} rows are allowed'}), 400
+            if row is None:
+                errors.append({'row': row_no, 'message': 'Invalid JSON'})
+                continue
+            fields = {key: (str(row.get(key) or "")).strip() for key in ("name", "guests", "price", "address", "description", "iban")}
+            if not all(fields.values()):
+                errors.append({'row': row_no, 'message': 'Missing required fields'})
+                continue
+            try:
+                fields["guests"] = int(fields["guests"])
+                fields["price"] = float(fields["price"])
+            except ValueError:
+                errors.append({'row': row_no, 'message': 'guests and price must be numbers'})
+                continue
+            images = row.get("images") or []
+            if len(images) < 3:
+                errors.append({'row': row_no, 'message': 'At least 3 images are required'})
+                continue
+            missing = [name for name in images if name not in archive_names]
+            if missing:
+                errors.append({'row': row_no, 'message': f'Images not found in archive: {", ".join(missing)}'})
+                continue
+            fields["images"] = [archive_names[name] for name in images]
+            rows.append((row_no, fields))
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'success': False, 'message': f'Unreadable listings file: {e}'}), 400
+
+    # 2. Geocoding and the insert run in a job; the client polls the import for its report.
+    # Only the images the valid rows use are kept for it, each once, not the whole archive.
+    def staged_images(import_id):
+        for name in dict.fromkeys(name for _, fields in rows for name in fields["images"]):
+            content = archive.read(name)
+            line = io.StringIO()
+            csv.writer(line).writerow([import_id, name, hashlib.sha256(content).hexdigest(), "\\x" + content.hex()])
+            yield line.getvalue().encode("utf-8")
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO bulk_imports (uid, rows, errors)
+                VALUES (%s, %s, %s)
+                RETURNING id;
+            """, (uid, json.dumps(rows), json.dumps(errors)))
+            import_id = cur.fetchone()[0]
+            cur.copy_expert("COPY bulk_import_images (import_id, name, sha256, image) FROM STDIN WITH (FORMAT csv)",
+                            IterStream(staged_images(import_id)))
+            enqueue_job(cur, "bulk_import", {"import_id": import_id}, max_attempts=3,
+                        lease_seconds=len(rows) / GEOCODE_RATE_PER_SEC + JOB_LEASE_SECONDS)
+            conn.commit()
+        ensure_job_workers()
+
+        response = jsonify({
+            'success': True,
+            'import_id': import_id,
+            'status': 'pending',
+            'status_url': url_for('bulk_import_status', import_id=import_id)
+        })
+        response.headers['Location'] = url_for('bulk_import_status', import_id=import_id)
+        return response, 202
+
+    except Exception as e:
+        print("Bulk import error:", e)
+        conn.rollback()
+        return jsonify({'success': False, 'message': 'Server error', 'error': str(e)}), 500
+    finally:
+        db_pool.putconn(conn)
+
+@app.route('/bulk-import-accommodations/<int:import_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Accommodations'],
+    'summary': 'Bulk import status',
+    'description': (
+        'Status of an import started by POST /bulk-import-accommodations. While `status` is `pending` the '
+        'rows are being geocoded and inserted; once `done`, `imported` maps rows to the new accommodation '
+        'ids and `errors` lists the rejected rows. `failed` means the import was given up and nothing was '
+        'imported. **Requires a valid JWT in the `Authorization` header.**'
+    ),
+    'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'import_id',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID returned when the import was started'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Import status and, once finished, the per-row report',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'import_id': 7,
+                        'status': 'done',
+                        'imported': [{'row': 1, 'aid': 101}, {'row': 3, 'aid': 102}],
+                        'errors': [{'row': 2, 'message': 'Address could not be geocoded'}]
+                    }
+                }
+            }
+        },
+        404: {
+            'description': 'No such import for this user'
+        }
+    }
+})
+@token_required
+def bulk_import_status(import_id):
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT status, imported, errors, message FROM bulk_imports
+                WHERE id = %s AND uid = %s;
+            """, (import_id, request.user['uid']))
+            row = cur.fetchone()
+        conn.rollback()
+
+        if not row:
+            return jsonify({'success': False, 'message': 'Import not found'}), 404
+        status, imported, errors, message = row
+
+        result = {'success': True, 'import_id': import_id, 'status': status}
+        if status == 'done':
+            result.update(imported=imported or [], errors=errors or [])
+        elif status == 'failed':
+            result['message'] = message
+        return jsonify(result), 200
+
+    except Exception as e:
+        print("Bulk import status error:", e)
+        return jsonify({'success': False, 'message': 'Server error', 'error': str(e)}), 500
+    finally:
+        db_pool.putconn(conn)
+
 @app.route('/edit-accommodation/<int:aid>', methods=['PUT'])
 @swag_from({
     'tags': ['Accommodations'],
@@ -602,7 +2309,7 @@ def edit_accommodation(aid):
             return jsonify({'success': False, 'message': 'At least 3 images are required'}), 400
 
         with conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM accommodations WHERE aid = %s AND owner_id = %s;", (aid, uid))
+            cursor.execute("SELECT * FROM accommodations WHERE aid = %s AND owner_id = %s AND deleted_at IS NULL;", (aid, uid))
             accommodation = cursor.fetchone()
 
             if not accommodation:
@@ -618,19 +2325,27 @@ def edit_accommodation(aid):
                     latitude = %s,
                     longitude = %s,
                     description = %s,
-                    iban = %s
+                    iban = %s,
+                    address = %s,
+                    geocode_status = 'done',
+                    search_vector = """ + SEARCH_VECTOR_SQL + """
                 WHERE aid = %s;
             """, (
                 name, location_city, location_country,
                 max_guests, price, latitude, longitude,
-                description, iban, aid
+                description, iban, address, name, description, aid
             ))
 
             cursor.execute("DELETE FROM pictures WHERE aid = %s;", (aid,))
             for img in images:
-                cursor.execute("INSERT INTO pictures (aid, image) VALUES (%s, %s);", (aid, psycopg2.Binary(img.read())))
+                content = img.read()
+                cursor.execute("INSERT INTO pictures (aid, image, sha256) VALUES (%s, %s, %s);",
+                               (aid, psycopg2.Binary(content), hashlib.sha256(content).hexdigest()))
 
+            bump_list_versions(cursor, aids=[aid])
+            notify_accommodations_changed(cursor, [aid])
             conn.commit()
+        drop_cached_accommodations([aid])
 
         return jsonify({'success': True, 'message': 'Accommodation updated', 'aid': aid}), 200
 
@@ -640,6 +2355,264 @@ def edit_accommodation(aid):
     finally:
         db_pool.putconn(conn)
 
+def parse_image_hashes(data) -> list[str]:
+    """images_sha256 as a JSON list, a JSON-encoded list, repeated form fields or a comma-separated string."""
+    if hasattr(data, "getlist") and len(data.getlist("images_sha256")) > 1:
+        raw = data.getlist("images_sha256")
+    else:
+        raw = data.get("images_sha256") or []
+        if isinstance(raw, str):
+            raw = raw.strip()
+            if raw.startswith("["):
+                try:
+                    raw = json.loads(raw)
+                except json.JSONDecodeError:
+                    raise ValueError("images_sha256 is not valid JSON")
+            else:
+                raw = raw.split(",")
+    if not isinstance(raw, list) or not all(isinstance(h, str) for h in raw):
+        raise ValueError("images_sha256 must be a list of hex SHA-256 strings")
+    return [h.strip().lower() for h in raw if h.strip()]
+
+@app.route('/accommodation/<int:aid>', methods=['PATCH'])
+@swag_from({
+    'tags': ['Accommodations'],
+    'summary': 'Partially update an accommodation',
+    'description': (
+        'Updates only the fields that are sent, as multipart form data or JSON. The address is geocoded '
+        'only when it differs from the stored one. Images are diffed by SHA-256: `images_sha256` lists the '
+        'hashes the accommodation should end up with (as returned by GET /accommodation/<aid>?enriched=1), '
+        'and `images` carries only the files that are not stored yet. The order of the list is not applied: '
+        'kept images keep their positions and new ones are appended in list order. Omitting both leaves '
+        'the images untouched. Requires a valid JWT in the `Authorization` header.'
+    ),
+    'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'aid',
+            'in': 'path',
+            'required': True,
+            'type': 'integer',
+            'description': 'ID of the accommodation to update'
+        }
+    ],
+    'requestBody': {
+        'required': True,
+        'content': {
+            'multipart/form-data': {
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'name': {'type': 'string'},
+                        'guests': {'type': 'string'},
+                        'price': {'type': 'string'},
+                        'address': {'type': 'string'},
+                        'description': {'type': 'string'},
+                        'iban': {'type': 'string'},
+                        'images_sha256': {
+                            'type': 'string',
+                            'description': 'SHA-256 hashes of the images to keep or add (order is ignored): a '
+                                           'JSON list, the field repeated, or comma-separated (JSON bodies '
+                                           'send a list)'
+                        },
+                        'images': {
+                            'type': 'array',
+                            'description': 'New images only',
+                            'items': {'type': 'string', 'format': 'binary'}
+                        }
+                    }
+                }
+            }
+        }
+    },
+    'responses': {
+        200: {
+            'description': 'Accommodation updated successfully',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'message': 'Accommodation updated',
+                        'aid': 123,
+                        'updated': ['price'],
+                        'images_added': 0,
+                        'images_removed': 0
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Empty or invalid field, ungeocodable address, unknown image hash or fewer than 3 images',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': False,
+                        'message': 'Image data missing for hash 9f86d081...'
+                    }
+                }
+            }
+        },
+        404: {
+            'description': 'Accommodation not found or unauthorized',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': False,
+                        'message': 'Accommodation not found or unauthorized'
+                    }
+                }
+            }
+        },
+        500: {
+            'description': 'Server error'
+        }
+    }
+})
+@token_required
+def patch_accommodation(aid):
+    uid = request.user['uid']
+    data = request.form if (request.form or request.files) else (request.get_json(silent=True) or {})
+    columns = {"name": "name", "guests": "max_guests", "price": "price_per_night",
+               "description": "description", "iban": "iban"}
+
+    changes = {}
+    for field in (*columns, "address"):
+        if field in data:
+            value = str(data.get(field) or "").strip()
+            if not value:
+                return jsonify({'success': False, 'message': f'{field} cannot be empty'}), 400
+            changes[field] = value
+    try:
+        if "guests" in changes:
+            changes["guests"] = int(changes["guests"])
+        if "price" in changes:
+            changes["price"] = float(changes["price"])
+    except ValueError:
+        return jsonify({'success': False, 'message': 'guests and price must be numbers'}), 400
+
+    uploads = {}
+    for img in request.files.getlist("images"):
+        content = img.read()
+        uploads[hashlib.sha256(content).hexdigest()] = content
+    wanted = None
+    if "images_sha256" in data:
+        try:
+            wanted = parse_image_hashes(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+
+    conn = db_pool.getconn()
+    try:
+        # Geocode before taking the row lock; a slow Nominatim call must not block other writers
+        geocoded = None
+        if "address" in changes:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT address, latitude FROM accommodations
+                    WHERE aid = %s AND owner_id = %s AND deleted_at IS NULL;
+                """, (aid, uid))
+                current = cursor.fetchone()
+            conn.rollback()
+            if not current:
+                return jsonify({'success': False, 'message': 'Accommodation not found or unauthorized'}), 404
+            if changes["address"] != current[0] or current[1] is None:
+                geocoded = geocode_address_full(changes["address"])
+                if not all(geocoded):
+                    return jsonify({'success': False, 'message': 'Address could not be geocoded'}), 400
+
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT name, description, address, latitude FROM accommodations
+                WHERE aid = %s AND owner_id = %s AND deleted_at IS NULL
+                FOR UPDATE;
+            """, (aid, uid))
+            current = cursor.fetchone()
+            if not current:
+                return jsonify({'success': False, 'message': 'Accommodation not found or unauthorized'}), 404
+            current_name, current_description, current_address, current_latitude = current
+
+            assignments = [
+                psycopg2.sql.SQL("{} = %s").format(psycopg2.sql.Identifier(columns[field]))
+                for field in columns if field in changes
+            ]
+            params = [changes[field] for field in columns if field in changes]
+
+            if "address" in changes and (changes["address"] != current_address or current_latitude is None):
+                if geocoded is None:
+                    # Someone else changed the address between our read and the lock
+                    conn.rollback()
+                    return jsonify({'success': False, 'message': 'Accommodation changed concurrently, retry'}), 409
+                latitude, longitude, city, country = geocoded
+                assignments.append(psycopg2.sql.SQL(
+                    "address = %s, latitude = %s, longitude = %s, location_city = %s, location_country = %s, "
+                    "geocode_status = 'done'"))
+                params += [changes["address"], latitude, longitude, city, country]
+            else:
+                changes.pop("address", None)
+
+            if "name" in changes or "description" in changes:
+                assignments.append(psycopg2.sql.SQL("search_vector = " + SEARCH_VECTOR_SQL))
+                params += [changes.get("name", current_name), changes.get("description", current_description)]
+
+            if assignments:
+                cursor.execute(
+                    psycopg2.sql.SQL("UPDATE accommodations SET {} WHERE aid = %s;").format(
+                        psycopg2.sql.SQL(", ").join(assignments)),
+                    params + [aid]
+                )
+                bump_list_versions(cursor, aids=[aid])
+
+            # Image diff: only hashes are compared, image bytes never leave the database
+            added = removed = 0
+            if wanted is not None or uploads:
+                cursor.execute("""
+                    SELECT pid, COALESCE(sha256, encode(sha256(image), 'hex')) FROM pictures WHERE aid = %s;
+                """, (aid,))
+                stored = {}
+                for pid, sha in cursor.fetchall():
+                    stored.setdefault(sha, []).append(pid)
+                target = set(wanted) if wanted is not None else set(stored) | set(uploads)
+
+                missing = [sha for sha in target if sha not in stored and sha not in uploads]
+                if missing:
+                    conn.rollback()
+                    return jsonify({'success': False, 'message': f'Image data missing for hash {missing[0]}'}), 400
+                if sum(len(stored.get(sha, [None])) for sha in target) < 3:
+                    conn.rollback()
+                    return jsonify({'success': False, 'message': 'At least 3 images are required'}), 400
+
+                stale = [pid for sha, pids in stored.items() if sha not in target for pid in pids]
+                if stale:
+                    cursor.execute("DELETE FROM pictures WHERE pid = ANY(%s);", (stale,))
+                for sha in (wanted if wanted is not None else uploads):
+                    if sha not in stored and sha in uploads:
+                        cursor.execute("INSERT INTO pictures (aid, image, sha256) VALUES (%s, %s, %s);",
+                                       (aid, psycopg2.Binary(uploads.pop(sha)), sha))
+                        added += 1
+                removed = len(stale)
+
+            if assignments or added or removed:
+                notify_accommodations_changed(cursor, [aid])
+            conn.commit()
+        if assignments or added or removed:
+            drop_cached_accommodations([aid])
+
+        return jsonify({
+            'success': True,
+            'message': 'Accommodation updated',
+            'aid': aid,
+            'updated': [field for field in (*columns, "address") if field in changes],
+            'images_added': added,
+            'images_removed': removed
+        }), 200
+
+    except Exception as e:
+        conn.rollback()
+        print("Patch accommodation error:", e)
+        return jsonify({'success': False, 'message': 'Server error', 'error': str(e)}), 500
+    finally:
+        db_pool.putconn(conn)
+
 @app.route('/like_dislike', methods=['POST'])
 @swag_from({
     'tags': ['Interactions'],
@@ -677,7 +2650,8 @@ def edit_accommodation(aid):
                     'example': {
                         'success': True,
                         'message': 'Liked accommodation',  # or "Unliked accommodation"
-                        'aid': 12
+                        'aid': 12,
+                        'like_count': 7
                     }
                 }
             }
@@ -721,41 +2695,23 @@ def like_dislike_accommodation() -> tuple[Response, int] | None:
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cur:
-            # 1. Who owns it and what's its name?
-            cur.execute(
-                """
-                SELECT owner_id, name
-                FROM accommodations
-                WHERE aid = %s;
-                """,
-                (aid,),
-            )
+            # Toggle, bump the counter and collect the notification data in one round trip
+            cur.execute(LIKE_TOGGLE_SQL, {"aid": aid, "uid": liker_uid})
             row = cur.fetchone()
             if not row:
+                conn.rollback()
                 return jsonify({"success": False, "message": "Accommodation not found"}), 404
-            owner_id, acc_name = row
-
-            cur.execute("SELECT email FROM users WHERE uid = %s;", (liker_uid,))
-            liker_email_row = cur.fetchone()
-            liker_email = liker_email_row[0] if liker_email_row else "unknown@email"
-
-            current_app.logger.debug(f"Owner={owner_id}, acc_name={acc_name}, liker_email={liker_email}")
+            owner_id, acc_name, liker_email, liked, like_count = row
+            liker_email = liker_email or "unknown@email"
+            bump_list_versions(cur, uids=[liker_uid])
+            action = "liked" if liked else "unliked"
 
-            cur.execute("SELECT 1 FROM liked WHERE uid = %s AND aid = %s;", (liker_uid, aid))
-            already = cur.fetchone() is not None
-
-            if already:
-                cur.execute("DELETE FROM liked WHERE uid = %s AND aid = %s;", (liker_uid, aid))
-                action = "unliked"
-            else:
-                cur.execute("INSERT INTO liked (uid, aid) VALUES (%s, %s);", (liker_uid, aid))
-                action = "liked"
+            current_app.logger.debug(f"Owner={owner_id}, acc_name={acc_name}, liker_email={liker_email}, action={action}")
 
         conn.commit()
 
-        # 4. Compose the sentence and push via WebSocket
-        text = f'Your accommodation "{acc_name}" was {action} by {liker_email}'
-        push_to_owner(owner_id, text)
+        # Queue the notification; the owner gets a coalesced digest via WebSocket
+        queue_like_notification(owner_id, aid, acc_name, liker_email, action)
 
         return (
             jsonify(
@@ -763,6 +2719,7 @@ def like_dislike_accommodation() -> tuple[Response, int] | None:
                     "success": True,
                     "message": f"{action.capitalize()} accommodation",
                     "aid": aid,
+                    "like_count": like_count,
                 }
             ),
             200,
@@ -828,24 +2785,14 @@ def like_dislike_accommodation() -> tuple[Response, int] | None:
     }
 })
 @token_required
+@list_etag()
 def get_liked_accommodations():
     uid = request.user['uid']
     conn = db_pool.getconn()
 
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    a.aid,
-                    a.name,
-                    a.location_city,
-                    a.location_country,
-                    a.price_per_night
-                FROM liked l
-                JOIN accommodations a ON a.aid = l.aid
-                WHERE l.uid = %s
-                LIMIT 20;
-            """, (uid,))
+            cursor.execute(LIKED_ACCOMMODATIONS_SQL, (uid,))
             results = cursor.fetchall()
 
         accommodations = []
@@ -939,6 +2886,7 @@ def get_liked_accommodations():
         }
     }
 })
+@rate_limited("geocode")
 def get_address_from_coordinates():
     data = request.json
     lat = data.get('latitude')
@@ -986,6 +2934,17 @@ def get_address_from_coordinates():
             'description': 'ID of the accommodation',
             'required': True,
             'type': 'integer'
+        },
+        {
+            'name': 'enriched',
+            'in': 'query',
+            'required': False,
+            'type': 'boolean',
+            'description': (
+                'Also return the IBAN, image URLs, whether the caller liked the accommodation and the '
+                'next free date range (to: null means open-ended), replacing the confirmation, image '
+                'and liked-list requests of the listing screen'
+            )
         }
     ],
     'responses': {
@@ -1005,6 +2964,7 @@ def get_address_from_coordinates():
                             'price_per_night': 150,
                             'description': 'A wonderful place to stay',
                             'owner_email': 'owner@example.com',
+                            'like_count': 7,
                         }
                     }
                 }
@@ -1037,33 +2997,20 @@ def get_address_from_coordinates():
 })
 @token_required
 def get_accommodation_details(aid):
+    if request.args.get("enriched", "").lower() in ("1", "true", "yes"):
+        return get_enriched_accommodation_details(aid)
 
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cursor:
             # Získaj základné info o ubytovaní + priemerné hodnotenie
-            cursor.execute("""
-                SELECT 
-                    a.name,
-                    a.location_city,
-                    a.location_country,
-                    a.max_guests,
-                    a.latitude,
-                    a.longitude,
-                    a.price_per_night,
-                    a.description,
-                    u.email AS owner_email
-                FROM accommodations a
-                JOIN users u ON u.uid = a.owner_id
-                WHERE a.aid = %s
-                GROUP BY a.aid, u.email;
-            """, (aid,))
+            cursor.execute(ACCOMMODATION_DETAILS_SQL, (aid,))
             result = cursor.fetchone()
 
             if not result:
                 return jsonify({'success': False, 'message': 'Accommodation not found'}), 404
 
-            (name, city, country, guests, lat, lon, price, desc, owner_email) = result
+            (name, city, country, guests, lat, lon, price, desc, owner_email, like_count) = result
 
             return jsonify({
                 'success': True,
@@ -1076,7 +3023,8 @@ def get_accommodation_details(aid):
                     'longitude': lon,
                     'price_per_night': price,
                     'description': desc,
-                    'owner_email': owner_email
+                    'owner_email': owner_email,
+                    'like_count': like_count
                 }
             }), 200
 
@@ -1087,6 +3035,65 @@ def get_accommodation_details(aid):
     finally:
         db_pool.putconn(conn)
 
+def get_enriched_accommodation_details(aid):
+    """Detail payload for the listing screen.
+
+    The shared part is cached per aid (and day, for the free range) until a change
+    notification drops it; like_count and is_liked are read for every request.
+    """
+    uid = request.user['uid']
+    today = date.today()
+    entry = None
+    if DETAIL_CACHE_TTL > 0:
+        with search_cache_lock:
+            entry = detail_cache.get(aid)
+            if entry is not None and (entry[0] < time.monotonic() or entry[1] != today):
+                del detail_cache[aid]
+                entry = None
+            elif entry is not None:
+                detail_cache.move_to_end(aid)
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            if entry is not None:
+                accommodation = dict(entry[2])
+                cursor.execute(ACCOMMODATION_VIEWER_SQL, (uid, aid))
+                viewer = cursor.fetchone()
+                if not viewer:
+                    drop_cached_accommodations([aid])
+                    return jsonify({'success': False, 'message': 'Accommodation not found'}), 404
+                accommodation['like_count'], accommodation['is_liked'] = viewer
+                return jsonify({'success': True, 'accommodation': accommodation}), 200
+
+            started_at = time.monotonic()
+            cursor.execute(ACCOMMODATION_DETAILS_ENRICHED_SQL, (uid, today, today, aid))
+            result = cursor.fetchone()
+
+            if not result:
+                return jsonify({'success': False, 'message': 'Accommodation not found'}), 404
+
+            shared, like_count, is_liked = enriched_accommodation(
+                aid, result, lambda aid, index: url_for('get_accommodation_image', aid=aid, image_index=index))
+            if DETAIL_CACHE_TTL > 0:
+                ensure_change_listener()
+                with search_cache_lock:
+                    # Skip caching if a change arrived while the query ran (or the replica it ran on lagged)
+                    if search_cache_invalidated_at <= db_pool.snapshot_time(conn, started_at):
+                        detail_cache[aid] = (time.monotonic() + DETAIL_CACHE_TTL, today, shared)
+                        detail_cache.move_to_end(aid)
+                        while len(detail_cache) > DETAIL_CACHE_MAX_ENTRIES:
+                            detail_cache.popitem(last=False)
+
+            return jsonify({'success': True, 'accommodation': {**shared, 'like_count': like_count,
+                                                               'is_liked': is_liked}}), 200
+
+    except Exception as e:
+        print("Get accommodation detail error:", e)
+        return jsonify({'success': False, 'message': 'Server error', 'error': str(e)}), 500
+    finally:
+        db_pool.putconn(conn)
+
 @app.route('/make-reservation', methods=['POST'])
 @swag_from({
     'tags': ['Reservations'],
@@ -1097,6 +3104,15 @@ def get_accommodation_details(aid):
         'Requires a valid JWT provided in the Authorization header.'
     ),
     'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'Idempotency-Key',
+            'in': 'header',
+            'type': 'string',
+            'required': False,
+            'description': 'Client-chosen key; retries with the same key replay the first response instead of repeating the request'
+        }
+    ],
     'requestBody': {
         'required': True,
         'content': {
@@ -1179,6 +3195,7 @@ def get_accommodation_details(aid):
     }
 })
 @token_required
+@idempotent
 def make_reservation():
     data = request.json
     aid = data.get("aid")
@@ -1193,24 +3210,35 @@ def make_reservation():
     try:
         with conn.cursor() as cursor:
             # Over, či dátumy nie sú kolízne s existujúcou rezerváciou
-            cursor.execute("""
-                SELECT * FROM reservations
-                WHERE aid = %s
-                    AND NOT (%s > "To" OR %s < "From")
-            """, (aid, date_from, date_to))
+            cursor.execute(RESERVATION_CONFLICT_SQL, (aid, date_from, date_to))
             conflict = cursor.fetchone()
 
             if conflict:
                 return jsonify({'success': False, 'message': 'Accommodation is already reserved in this date range'}), 409
 
-            # Ak nie je konflikt, vytvor rezerváciu
+            # Ak nie je konflikt, vytvor rezerváciu a zapíš obsadené noci do rollupu
             cursor.execute("""
-                INSERT INTO reservations (aid, "From", "To", reserved_by)
-                VALUES (%s, %s, %s, %s)
-                RETURNING rid;
-            """, (aid, date_from, date_to, uid))
-            rid = cursor.fetchone()[0]
+                WITH r AS (
+                    INSERT INTO reservations (aid, "From", "To", reserved_by)
+                    SELECT aid, %s, %s, %s FROM accommodations
+                    WHERE aid = %s AND deleted_at IS NULL AND geocode_status = 'done'
+                    RETURNING rid, aid, "From", "To"
+                ), nights AS (
+                    INSERT INTO occupancy_nights (aid, night, rid, is_checkin)
+                    SELECT r.aid, d::date, r.rid, d::date = r."From"
+                    FROM r, generate_series(r."From", r."To", interval '1 day') d
+                )
+                SELECT rid FROM r;
+            """, (date_from, date_to, uid, aid))
+            row = cursor.fetchone()
+            if row is None:
+                conn.rollback()
+                return jsonify({'success': False, 'message': 'Accommodation not found'}), 404
+            rid = row[0]
+            bump_list_versions(cursor, uids=[uid])
+            notify_accommodations_changed(cursor, [aid])
             conn.commit()
+        drop_cached_accommodations([aid])
 
         return jsonify({'success': True, 'message': 'Reservation created', 'rid': rid}), 201
 
@@ -1292,8 +3320,19 @@ def delete_reservation(rid):
                 return jsonify({'success': False, 'message': 'Reservation not found or unauthorized'}), 404
 
             # Vymaž rezerváciu
-            cursor.execute("DELETE FROM reservations WHERE rid = %s;", (rid,))
+            cursor.execute("""
+                WITH r AS (
+                    DELETE FROM reservations WHERE rid = %s RETURNING rid, aid
+                ), nights AS (
+                    DELETE FROM occupancy_nights WHERE rid IN (SELECT rid FROM r)
+                )
+                SELECT aid FROM r;
+            """, (rid,))
+            aids = [row[0] for row in cursor.fetchall()]
+            bump_list_versions(cursor, uids=[uid])
+            notify_accommodations_changed(cursor, aids)
             conn.commit()
+        drop_cached_accommodations(aids)
 
         return jsonify({'success': True, 'message': f'Reservation {rid} deleted'}), 200
 
@@ -1313,6 +3352,15 @@ def delete_reservation(rid):
         'This endpoint requires a valid JWT provided in the Authorization header.'
     ),
     'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'stream',
+            'in': 'query',
+            'required': False,
+            'type': 'boolean',
+            'description': 'Stream the list through a server-side cursor instead of building it in memory'
+        }
+    ],
     'responses': {
         200: {
             'description': 'Accommodations retrieved successfully',
@@ -1347,31 +3395,32 @@ def delete_reservation(rid):
     }
 })
 @token_required
+@list_etag()
 def get_my_accommodations():
     uid = request.user['uid']
+    query = MY_ACCOMMODATIONS_SQL
+
+    def to_item(row):
+        aid, name, city, country, geocode_status = row
+        return {
+            'aid': aid,
+            'name': name,
+            'city': city,
+            'country': country,
+            # 'pending' and 'failed' listings are hidden from everyone else until the address resolves
+            'geocoding': geocode_status
+        }
+
+    if wants_stream():
+        return stream_json_rows(query, (uid,), to_item, '{"success": true, "accommodations": [', ']}')
+
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    a.aid,
-                    a.name,
-                    a.location_city,
-                    a.location_country
-                FROM accommodations a
-                WHERE a.owner_id = %s;
-            """, (uid,))
+            cursor.execute(query, (uid,))
             results = cursor.fetchall()
 
-        accommodations = []
-        for row in results:
-            aid, name, city, country = row
-            accommodations.append({
-                'aid': aid,
-                'name': name,
-                'city': city,
-                'country': country
-            })
+        accommodations = [to_item(row) for row in results]
 
         return jsonify({'success': True, 'accommodations': accommodations}), 200
 
@@ -1382,6 +3431,82 @@ def get_my_accommodations():
         db_pool.putconn(conn)
 
 
+@app.route('/owner/dashboard', methods=['GET'])
+@swag_from({
+    'tags': ['Accommodations'],
+    'summary': 'Owner dashboard',
+    'description': (
+        'Returns, for every accommodation owned by the authenticated user, the number of upcoming reservations, '
+        'the occupancy percentage for the next 30 and 90 days, the like count and an estimated revenue for the '
+        'next 90 days (booked nights × price per night). Requires a valid JWT in the Authorization header.'
+    ),
+    'security': [{'BearerAuth': []}],
+    'responses': {
+        200: {
+            'description': 'Dashboard retrieved successfully',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'accommodations': [
+                            {
+                                'aid': 1,
+                                'name': 'Hotel Sunshine',
+                                'upcoming_reservations': 3,
+                                'occupancy_30': 40.0,
+                                'occupancy_90': 23.3,
+                                'like_count': 12,
+                                'revenue_estimate_90': 2100
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        500: {
+            'description': 'Server error',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': False,
+                        'message': 'Server error',
+                        'error': 'Detailed error message'
+                    }
+                }
+            }
+        }
+    }
+})
+@token_required
+def owner_dashboard():
+    uid = request.user['uid']
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            # Všetko sa počíta z rollupu occupancy_nights, nie z tabuľky reservations
+            cursor.execute(OWNER_DASHBOARD_SQL, {"today": date.today(), "uid": uid})
+            rows = cursor.fetchall()
+
+        accommodations = [
+            {
+                'aid': aid,
+                'name': name,
+                'upcoming_reservations': upcoming,
+                'occupancy_30': round(nights_30 * 100 / 30, 1),
+                'occupancy_90': round(nights_90 * 100 / 90, 1),
+                'like_count': like_count,
+                'revenue_estimate_90': revenue_90
+            }
+            for aid, name, like_count, upcoming, nights_30, nights_90, revenue_90 in rows
+        ]
+        return jsonify({'success': True, 'accommodations': accommodations}), 200
+
+    except Exception as e:
+        print("Owner dashboard error:", e)
+        return jsonify({'success': False, 'message': 'Server error', 'error': str(e)}), 500
+    finally:
+        db_pool.putconn(conn)
+
 @app.route('/my-reservations', methods=['GET'])
 @swag_from({
     'tags': ['Reservations'],
@@ -1392,6 +3517,15 @@ def get_my_accommodations():
         'This endpoint requires a valid JWT provided in the Authorization header.'
     ),
     'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'stream',
+            'in': 'query',
+            'required': False,
+            'type': 'boolean',
+            'description': 'Stream the list through a server-side cursor instead of building it in memory'
+        }
+    ],
     'responses': {
         200: {
             'description': 'Reservations retrieved successfully',
@@ -1432,31 +3566,30 @@ def get_my_accommodations():
     }
 })
 @token_required
+@list_etag()
 def get_my_reservations():
     uid = request.user['uid']
+    query = MY_RESERVATIONS_SQL
+
+    def to_item(row):
+        rid, aid, city, country = row
+        return {
+            "rid": rid,
+            "aid": aid,
+            "city": city,
+            "country": country
+        }
+
+    if wants_stream():
+        return stream_json_rows(query, (uid,), to_item, '{"success": true, "reservations": [', ']}')
+
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    r.rid,
-                    r.aid,
-                    a.location_city,
-                    a.location_country
-                FROM reservations r
-                JOIN accommodations a ON r.aid = a.aid
-                WHERE r.reserved_by = %s;
-            """, (uid,))
+            cursor.execute(query, (uid,))
             reservations = cursor.fetchall()
 
-        result = []
-        for rid, aid, city, country in reservations:
-            result.append({
-                "rid": rid,
-                "aid": aid,
-                "city": city,
-                "country": country
-            })
+        result = [to_item(row) for row in reservations]
 
         return jsonify({'success': True, 'reservations': result}), 200
 
@@ -1471,9 +3604,12 @@ def get_my_reservations():
     'tags': ['Accommodations'],
     'summary': 'Search accommodations',
     'description': (
-        'Search for accommodations based on optional filters: location, date range, and number of guests. '
+        'Search for accommodations based on optional filters: free-text query, location, date range, and number of guests. '
         'If a location is provided, it is geocoded to latitude and longitude and accommodations within a 50 km radius are returned. '
         'Additionally, if a date range is provided, accommodations with conflicting reservations are excluded. '
+        'If a query (q) is provided, only accommodations whose name or description match it are returned, best matches first. '
+        'Results can be limited to a price range and sorted by relevance, price, distance or popularity. '
+        'When limit is given, results are paged with an opaque keyset cursor. '
         'A valid JWT is required in the Authorization header.'
     ),
     'security': [{'BearerAuth': []}],
@@ -1484,6 +3620,10 @@ def get_my_reservations():
                 'schema': {
                     'type': 'object',
                     'properties': {
+                        'q': {
+                            'type': 'string',
+                            'description': 'Free-text query matched against name and description (e.g., "sea view apartment")'
+                        },
                         'location': {
                             'type': 'string',
                             'description': 'Location to search for (e.g., "Zagreb")'
@@ -1501,13 +3641,38 @@ def get_my_reservations():
                         'guests': {
                             'type': 'integer',
                             'description': 'Minimum number of guests the accommodation must support'
+                        },
+                        'min_price': {
+                            'type': 'number',
+                            'description': 'Minimum price per night'
+                        },
+                        'max_price': {
+                            'type': 'number',
+                            'description': 'Maximum price per night'
+                        },
+                        'sort': {
+                            'type': 'string',
+                            'enum': ['relevance', 'price', 'price_desc', 'distance', 'popularity'],
+                            'description': 'Result order; defaults to relevance when q is given. distance requires location.'
+                        },
+                        'limit': {
+                            'type': 'integer',
+                            'description': 'Page size. When set, the response includes next_cursor for the following page.'
+                        },
+                        'cursor': {
+                            'type': 'string',
+                            'description': 'next_cursor from the previous page (same filters and sort)'
                         }
                     },
                     'example': {
+                        "q": "sea view apartment",
                         "location": "Zagreb",
                         "from": "2025-06-01",
                         "to": "2025-06-10",
-                        "guests": 2
+                        "guests": 2,
+                        "max_price": 150,
+                        "sort": "price",
+                        "limit": 20
                     }
                 }
             }
@@ -1525,15 +3690,33 @@ def get_my_reservations():
                                 "aid": 1,
                                 "name": "Cozy Apartment",
                                 "price_per_night": 80,
-                                "location": "Zagreb, Croatia"
+                                "location": "Zagreb, Croatia",
+                                "like_count": 12,
+                                "is_liked": True,
+                                "image_url": "/accommodations/1/image/1"
                             },
                             {
                                 "aid": 2,
                                 "name": "Modern Studio",
                                 "price_per_night": 120,
-                                "location": "Zagreb, Croatia"
+                                "location": "Zagreb, Croatia",
+                                "like_count": 3,
+                                "is_liked": False,
+                                "image_url": "/accommodations/2/image/1"
                             }
-                        ]
+                        ],
+                        "next_cursor": "WyJwcmljZSIsICIxMjAiLCAyXQ=="
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid filter, sort, limit or cursor',
+            'content': {
+                'application/json': {
+                    'example': {
+                        "success": False,
+                        "message": "Invalid cursor"
                     }
                 }
             }
@@ -1554,75 +3737,62 @@ def get_my_reservations():
 })
 @token_required
 def search_accommodations():
-    data = request.json
-    location = data.get("location")  # napr. "Zagreb"
-    date_from = data.get("from")
-    date_to = data.get("to")
-    guests = data.get("guests")
+    try:
+        search = parse_search_request(request.json, SEARCH_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+
+    location, date_from, date_to = search["location"], search["date_from"], search["date_to"]
+    guests, text_query, sort = search["guests"], search["text_query"], search["sort"]
+    min_price, max_price = search["min_price"], search["max_price"]
+    limit, cursor_token, after = search["limit"], search["cursor"], search["after"]
+
+    cache_key = (
+        " ".join((location or "").lower().split()), date_from, date_to, str(guests or ""),
+        " ".join(text_query.lower().split()), min_price, max_price, sort, limit, cursor_token
+    )
+    cached = search_cache_get(cache_key)
 
     latitude = longitude = None
-    if location:
+    if location and cached is None:
+        # Only searches that reach Nominatim spend the geocode budget
+        limited = rate_limit_exceeded("geocode")
+        if limited is not None:
+            return limited
         lat, lon, _, _ = geocode_address_full(location)
         latitude, longitude = lat, lon
+        if sort == "distance" and not (latitude and longitude):
+            return jsonify({"success": True, "results": [], "next_cursor": None}), 200
 
     conn = db_pool.getconn()
     try:
         with conn.cursor() as cursor:
-            query = """
-                SELECT
-                    a.aid,
-                    a.name,
-                    a.price_per_night,
-                    a.location_city,
-                    a.location_country,
-                    a.latitude,
-                    a.longitude
-                FROM accommodations a
-                WHERE TRUE
-            """
-            params = []
-
-            # Filtrovanie podľa počtu hostí
-            if guests:
-                query += " AND a.max_guests >= %s"
-                params.append(guests)
-
-            # Filtrovanie podľa vzdialenosti (Haversine formula)
-            if latitude and longitude:
-                query += """
-                    AND (
-                        6371000 * acos(
-                            cos(radians(%s)) * cos(radians(a.latitude)) *
-                            cos(radians(a.longitude) - radians(%s)) +
-                            sin(radians(%s)) * sin(radians(a.latitude))
-                        )
-                    ) < 50000
-                """
-                params.extend([latitude, longitude, latitude])
-
-            cursor.execute(query, tuple(params))
-            accommodations = cursor.fetchall()
-
-            result = []
-            for aid, name, price, city, country, lat, lon in accommodations:
-                # Over dostupnosť podľa dátumov
-                if date_from and date_to:
-                    cursor.execute("""
-                        SELECT 1 FROM reservations
-                        WHERE aid = %s
-                        AND NOT (%s > "To" OR %s < "From")
-                    """, (aid, date_from, date_to))
-                    reserved = cursor.fetchone()
-                    if reserved:
-                        continue
-
-                result.append({
-                    "aid": aid,
-                    "name": name,
-                    "price_per_night": price,
-                    "location": f"{city}, {country}"
-                })
-
+            if cached is None:
+                started_at = time.monotonic()
+                query, params = build_search_query(
+                    text_query=text_query, guests=guests, min_price=min_price, max_price=max_price,
+                    latitude=latitude, longitude=longitude, date_from=date_from, date_to=date_to,
+                    sort=sort, after=after, limit=limit + 1 if limit else None
+                )
+                cursor.execute(query, params)
+                accommodations = cursor.fetchall()
+
+                next_cursor = None
+                if limit and len(accommodations) > limit:
+                    accommodations = accommodations[:limit]
+                    last = accommodations[-1]
+                    next_cursor = encode_search_cursor(sort, last[5], last[0])
+
+                cached = ([row[0] for row in accommodations], next_cursor)
+                search_cache_put(cache_key, cached[0], next_cursor, db_pool.snapshot_time(conn, started_at))
+
+            # Cards (and the per-user is_liked flag) are always resolved fresh
+            aids, next_cursor = cached
+            cards = fetch_accommodation_cards(cursor, request.user['uid'], aids)
+            result = [cards[aid] for aid in aids if aid in cards]
+
+        if limit:
+            return jsonify({"success": True, "results": result, "next_cursor": next_cursor}), 200
         return jsonify({"success": True, "results": result}), 200
 
     except Exception as e:
@@ -1700,7 +3870,8 @@ def accommodation_confirmation(aid):
     try:
         with conn.cursor() as cursor:
             cursor.execute("""
-                SELECT price_per_night, iban FROM accommodations WHERE aid = %s;
+                SELECT price_per_night, iban FROM accommodations
+                WHERE aid = %s AND deleted_at IS NULL AND geocode_status = 'done';
             """, (aid,))
             accommodation = cursor.fetchone()
 
@@ -1778,9 +3949,11 @@ def main_screen_accommodations():
                     a.price_per_night,
                     a.location_city,
                     a.location_country,
+                    a.like_count,
                     CASE WHEN l.aid IS NOT NULL THEN TRUE ELSE FALSE END AS is_liked
                 FROM accommodations a
                 LEFT JOIN liked l ON a.aid = l.aid AND l.uid = %s
+                WHERE a.deleted_at IS NULL AND a.geocode_status = 'done'
                 ORDER BY RANDOM()
                 LIMIT 5;
             """
@@ -1793,9 +3966,10 @@ def main_screen_accommodations():
                 "name": name,
                 "price_per_night": price,
                 "location": f"{city}, {country}",
+                "like_count": like_count,
                 "is_liked": is_liked
             }
-            for aid, name, price, city, country, is_liked in accommodations
+            for aid, name, price, city, country, like_count, is_liked in accommodations
         ]
 
         return jsonify({"success": True, "results": result}), 200
@@ -1811,6 +3985,124 @@ def main_screen_accommodations():
     finally:
         db_pool.putconn(conn)
 
+def fetch_accommodation_cards(cursor, uid: int, aids: list[int]) -> dict[int, dict]:
+    """Summary cards for the given aids, with the caller's like state, in one query."""
+    if not aids:
+        return {}
+    cursor.execute(ACCOMMODATION_CARDS_SQL, (uid, list(aids)))
+
+    cards = {}
+    for aid, name, price, city, country, like_count, is_liked, has_image in cursor.fetchall():
+        cards[aid] = {
+            "aid": aid,
+            "name": name,
+            "price_per_night": price,
+            "location": f"{city}, {country}",
+            "like_count": like_count,
+            "is_liked": is_liked,
+            "image_url": url_for('get_accommodation_image', aid=aid, image_index=1) if has_image else None
+        }
+    return cards
+
+@app.route('/accommodations/batch', methods=['GET'])
+@swag_from({
+    'tags': ['Accommodations'],
+    'summary': 'Retrieve summary cards for several accommodations',
+    'description': (
+        'Returns summary cards (name, price, location, like count, first image URL and whether the caller '
+        'liked the accommodation) for a comma-separated list of accommodation IDs, in the requested order. '
+        'Unknown IDs are skipped. Requires a valid JWT in the Authorization header.'
+    ),
+    'security': [{'BearerAuth': []}],
+    'parameters': [
+        {
+            'name': 'ids',
+            'in': 'query',
+            'required': True,
+            'type': 'string',
+            'description': 'Comma-separated accommodation IDs, e.g. "1,5,12"'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Accommodation cards retrieved successfully',
+            'content': {
+                'application/json': {
+                    'example': {
+                        "success": True,
+                        "accommodations": [
+                            {
+                                "aid": 1,
+                                "name": "Cozy Apartment",
+                                "price_per_night": 80,
+                                "location": "Zagreb, Croatia",
+                                "like_count": 12,
+                                "is_liked": True,
+                                "image_url": "/accommodations/1/image/1"
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Missing, invalid or too many IDs',
+            'content': {
+                'application/json': {
+                    'example': {
+                        "success": False,
+                        "message": "Invalid ids parameter"
+                    }
+                }
+            }
+        },
+        500: {
+            'description': 'Server error',
+            'content': {
+                'application/json': {
+                    'example': {
+                        "success": False,
+                        "message": "Server error",
+                        "error": "Detailed error message"
+                    }
+                }
+            }
+        }
+    }
+})
+@token_required
+def accommodations_batch():
+    uid = request.user['uid']
+    raw_ids = ",".join(request.args.getlist("ids"))
+
+    try:
+        aids = list(dict.fromkeys(int(part) for part in raw_ids.split(",") if part.strip()))
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid ids parameter"}), 400
+
+    if not aids:
+        return jsonify({"success": False, "message": "Missing ids parameter"}), 400
+    if len(aids) > BATCH_MAX_IDS:
+        return jsonify({"success": False, "message": f"At most {BATCH_MAX_IDS} ids are allowed"}), 400
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            cards = fetch_accommodation_cards(cursor, uid, aids)
+
+        return jsonify({"success": True, "accommodations": [cards[aid] for aid in aids if aid in cards]}), 200
+
+    except Exception as e:
+        conn.rollback()
+        print("Accommodations batch error:", e)
+        return jsonify({
+            "success": False,
+            "message": "Server error",
+            "error": str(e)
+        }), 500
+    finally:
+        db_pool.putconn(conn)
+
 @app.route('/accommodations/<int:aid>/image/<int:image_index>', methods=['GET'])
 @swag_from({
     'tags': ['Accommodations'],
@@ -1898,16 +4190,7 @@ def get_accommodation_image(aid, image_index):
     try:
         with conn.cursor() as cur:
             offset = image_index - 1
-            cur.execute(
-                """
-                SELECT image
-                FROM pictures
-                WHERE aid = %s
-                ORDER BY pid ASC
-                LIMIT 1 OFFSET %s;
-                """,
-                (aid, offset)
-            )
+            cur.execute(ACCOMMODATION_IMAGE_SQL, (aid, offset))
             row = cur.fetchone()
         if not row:
             abort(404, description="Image not found")
@@ -1923,6 +4206,7 @@ def get_accommodation_image(aid, image_index):
 
 @app.route('/upcoming_reservations', methods=['GET'])
 @token_required
+@list_etag(per_day=True)
 def upcoming_reservations():
     current_app.logger.debug("→ entered upcoming_reservations")
 
@@ -1938,15 +4222,14 @@ def upcoming_reservations():
     today = date.today()
     current_app.logger.debug("Using date filter from %s onward", today)
 
+    query = UPCOMING_RESERVATIONS_SQL
+    if wants_stream():
+        return stream_json_rows(query, (user_id, today),
+                                lambda row: {'from': row[0].isoformat(), 'to': row[1].isoformat()})
+
     conn = db_pool.getconn()
     try:
         cur = conn.cursor()
-        query = (
-            'SELECT "From", "To" '
-            'FROM reservations '
-            'WHERE reserved_by = %s AND "From" >= %s '
-            'ORDER BY "From"'
-        )
         current_app.logger.debug("Executing SQL: %s with params (%s, %s)", query, user_id, today)
         cur.execute(query, (user_id, today))
 
@@ -1969,6 +4252,128 @@ def upcoming_reservations():
     finally:
         db_pool.putconn(conn)
 
+def run_batch_item(path: str, conn) -> dict:
+    """Run one GET sub-request of /batch through the full request stack in its own context.
+
+    before/after_request hooks apply, so every item passes its route class's admission
+    gate like a standalone request.
+    """
+    url_path, _, query = path.partition("?")
+    # Sub-responses are embedded in one JSON document, so streaming is not offered
+    query = urlencode([(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k != 'stream'])
+    environ = EnvironBuilder(
+        path=url_path, base_url=request.host_url, query_string=query, method='GET',
+        headers={'Authorization': request.headers.get('Authorization', '')}
+    ).get_environ()
+    environ['REMOTE_ADDR'] = request.remote_addr
+    environ['roomfinder.db_conn'] = conn
+    environ['roomfinder.user'] = request.user
+    environ['roomfinder.batch_item'] = True
+
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            app.logger.error(f"Batch sub-request {path} failed: {e}")
+            return {'path': path, 'status': 500, 'body': {'success': False, 'message': 'Server error'}}
+    return {
+        'path': path,
+        'status': response.status_code,
+        'body': response.get_json(silent=True) if response.is_json else None
+    }
+
+@app.route('/batch', methods=['POST'])
+@swag_from({
+    'tags': ['Batch'],
+    'summary': 'Run several GET requests in one round trip',
+    'description': (
+        'Executes a list of GET sub-requests (paths with optional query strings, e.g. "/accommodation/5") '
+        'with the caller\'s token and returns every result in order with its own HTTP status. '
+        'Non-JSON responses (images) report only their status. Sub-requests share one database '
+        'connection. Requires a valid JWT in the Authorization header.'
+    ),
+    'security': [{'BearerAuth': []}],
+    'requestBody': {
+        'required': True,
+        'content': {
+            'application/json': {
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'requests': {
+                            'type': 'array',
+                            'items': {'type': 'string'},
+                            'description': 'GET paths to run, at most BATCH_MAX_REQUESTS'
+                        }
+                    },
+                    'required': ['requests']
+                },
+                'example': {
+                    'requests': ['/accommodation/5', '/accommodation-confirmation/5', '/accommodations/5/image/1']
+                }
+            }
+        }
+    },
+    'responses': {
+        200: {
+            'description': 'Sub-requests executed; see each item\'s status',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'success': True,
+                        'responses': [
+                            {'path': '/accommodation/5', 'status': 200,
+                             'body': {'success': True, 'accommodation': {'aid': 5, 'name': 'Cozy Apartment'}}},
+                            {'path': '/accommodations/5/image/1', 'status': 200, 'body': None}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Missing, invalid or too many sub-requests',
+            'content': {
+                'application/json': {
+                    'example': {'success': False, 'message': 'Invalid requests list'}
+                }
+            }
+        }
+    }
+})
+@token_required
+def batch():
+    paths = (request.get_json(silent=True) or {}).get('requests')
+    if (not isinstance(paths, list) or not paths or len(paths) > BATCH_MAX_REQUESTS
+            or not all(isinstance(p, str) and p.startswith('/') and not p.startswith('/batch') for p in paths)):
+        return jsonify({'success': False, 'message': 'Invalid requests list'}), 400
+
+    # One checkout and one token check for the whole screen. The items run one after
+    # another: statements on a single connection are serialized by libpq anyway.
+    conn = db_pool.getconn()
+    try:
+        responses = []
+        for path in paths:
+            responses.append(run_batch_item(path, conn))
+            # Start every item clean, even if the previous one left a failed transaction
+            conn.rollback()
+        return jsonify({'success': True, 'responses': responses}), 200
+    finally:
+        db_pool.putconn(conn)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Host-wide totals (shared_state.py), so one scrape through any worker sees them all
+    if not METRICS_TOKEN:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return Response("Unauthorized\n", status=401, mimetype="text/plain", headers={"WWW-Authenticate": "Bearer"})
+
+    lines = []
+    for name, labels, value in read_metrics():
+        sample = int(value) if value.is_integer() else value
+        label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+        lines.append(f"{name}{{{label_text}}} {sample}" if labels else f"{name} {sample}")
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     socketio.run(host="0.0.0.0", port=5001)
\ No newline at end of file
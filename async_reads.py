@@ -0,0 +1,272 @@
+"""Asyncio server for the hot read endpoints (detail, image, search).
+
+Serves the same URLs and JSON as app.py from an asyncpg pool, so one worker
+can keep many slow reads (geocoding, large images) in flight without a thread
+or greenlet per request. Writes stay on the Flask app; put this server behind
+the same proxy and route only these paths to it.
+
+Run it on the same host as the Flask workers with the same SHARED_STATE_DIR, so
+rate limits are shared.
+
+Run with:
+    gunicorn async_reads:app -k aiohttp.GunicornWebWorker -b 0.0.0.0:5002
+"""
+import os
+import json
+import math
+from datetime import date
+from decimal import Decimal
+from functools import wraps
+
+import jwt
+import aiohttp
+import asyncpg
+from aiohttp import web
+from dotenv import load_dotenv
+
+from queries import (
+    ACCOMMODATION_DETAILS_SQL, ACCOMMODATION_DETAILS_ENRICHED_SQL, ACCOMMODATION_IMAGE_SQL,
+    ACCOMMODATION_CARDS_SQL, build_search_query, encode_search_cursor, parse_search_request,
+    enriched_accommodation
+)
+from shared_state import RATE_LIMITS, take_token
+
+load_dotenv()
+SECRET_KEY = os.environ.get("SECRET_KEY")
+# Reads here are not pinned after a write, so default to the primary like the Flask app
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or os.environ.get("DATABASE_URL")
+ASYNC_POOL_MIN = int(os.environ.get("ASYNC_POOL_MIN", "2"))
+ASYNC_POOL_MAX = int(os.environ.get("ASYNC_POOL_MAX", "20"))
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", "100"))
+
+# Cursor sort values come back as JSON strings/numbers; asyncpg needs the column's type
+CURSOR_VALUE_TYPES = {"price": Decimal, "price_desc": Decimal, "popularity": int,
+                      "relevance": float, "distance": float, None: int}
+
+
+def to_asyncpg(query: str) -> str:
+    """Rewrite psycopg2 %s placeholders as asyncpg's $1, $2, ..."""
+    parts = query.split("%s")
+    out = [parts[0]]
+    for n, part in enumerate(parts[1:], start=1):
+        out.append(f"${n}{part}")
+    return "".join(out).replace("%%", "%")
+
+
+def json_response(payload, status=200, headers=None):
+    # Same encoding as Flask's jsonify: sorted keys, Decimal/date as strings
+    return web.json_response(payload, status=status, headers=headers,
+                             dumps=lambda obj: json.dumps(obj, sort_keys=True, default=str))
+
+
+def token_required(handler):
+    @wraps(handler)
+    async def decorated(request):
+        token = None
+        if 'Authorization' in request.headers:
+            bearer = request.headers['Authorization']
+            token = bearer.split(" ")[1] if " " in bearer else bearer
+
+        if not token:
+            return json_response({'message': 'Token is missing!'}, 401)
+
+        try:
+            request['user'] = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            return json_response({'message': 'Token expired'}, 401)
+        except jwt.InvalidTokenError:
+            return json_response({'message': 'Invalid token'}, 401)
+
+        return await handler(request)
+    return decorated
+
+
+async def geocode_address(session, address):
+    url = "https://nominatim.openstreetmap.org/search"
+    params = {'q': address, 'format': 'json', 'limit': '1'}
+    headers = {'User-Agent': 'mtaa-app/1.0'}
+
+    async with session.get(url, params=params, headers=headers) as response:
+        data = await response.json(content_type=None)
+
+    if data:
+        return float(data[0]['lat']), float(data[0]['lon'])
+    return None, None
+
+
+async def get_enriched_accommodation_details(request, aid):
+    # Same payload as the Flask app's ?enriched=1, without its per-process detail cache
+    today = date.today()
+    try:
+        async with request.app['db'].acquire() as conn:
+            result = await conn.fetchrow(to_asyncpg(ACCOMMODATION_DETAILS_ENRICHED_SQL),
+                                         request['user']['uid'], today, today, aid)
+
+        if not result:
+            return json_response({'success': False, 'message': 'Accommodation not found'}, 404)
+
+        shared, like_count, is_liked = enriched_accommodation(
+            aid, tuple(result), lambda aid, index: f"/accommodations/{aid}/image/{index}")
+        return json_response({'success': True, 'accommodation': {**shared, 'like_count': like_count,
+                                                                 'is_liked': is_liked}})
+
+    except Exception as e:
+        print("Get accommodation detail error:", e)
+        return json_response({'success': False, 'message': 'Server error', 'error': str(e)}, 500)
+
+
+@token_required
+async def get_accommodation_details(request):
+    aid = int(request.match_info['aid'])
+    if request.query.get("enriched", "").lower() in ("1", "true", "yes"):
+        return await get_enriched_accommodation_details(request, aid)
+
+    try:
+        async with request.app['db'].acquire() as conn:
+            result = await conn.fetchrow(to_asyncpg(ACCOMMODATION_DETAILS_SQL), aid)
+
+        if not result:
+            return json_response({'success': False, 'message': 'Accommodation not found'}, 404)
+
+        (name, city, country, guests, lat, lon, price, desc, owner_email, like_count) = result
+
+        return json_response({
+            'success': True,
+            'accommodation': {
+                'aid': aid,
+                'name': name,
+                'location': f"{city}, {country}",
+                'max_guests': guests,
+                'latitude': lat,
+                'longitude': lon,
+                'price_per_night': price,
+                'description': desc,
+                'owner_email': owner_email,
+                'like_count': like_count
+            }
+        })
+
+    except Exception as e:
+        print("Get accommodation detail error:", e)
+        return json_response({'success': False, 'message': 'Server error', 'error': str(e)}, 500)
+
+
+@token_required
+async def get_accommodation_image(request):
+    aid = int(request.match_info['aid'])
+    image_index = int(request.match_info['image_index'])
+    if image_index < 1:
+        raise web.HTTPBadRequest(text="Invalid image_index")
+
+    try:
+        async with request.app['db'].acquire() as conn:
+            image = await conn.fetchval(to_asyncpg(ACCOMMODATION_IMAGE_SQL), aid, image_index - 1)
+    except Exception as e:
+        print(f"Error fetching image aid={aid} idx={image_index}: {e}")
+        raise web.HTTPInternalServerError(text="Server error")
+
+    if image is None:
+        raise web.HTTPNotFound(text="Image not found")
+
+    return web.Response(body=image, content_type='image/jpeg',
+                        headers={'Cache-Control': 'public, max-age=3600'})
+
+
+@token_required
+async def search_accommodations(request):
+    try:
+        search = parse_search_request(await request.json(), SEARCH_MAX_LIMIT)
+    except ValueError as e:
+        return json_response({"success": False, "message": str(e)}, 400)
+
+    sort, limit, after = search["sort"], search["limit"], search["after"]
+
+    try:
+        latitude = longitude = None
+        if search["location"]:
+            # Same bucket as the Flask route, so either server spends one Nominatim budget
+            retry_after = take_token(f"geocode:u{request['user']['uid']}", RATE_LIMITS["geocode"])
+            if retry_after:
+                return json_response({'success': False, 'message': 'Too many requests'}, 429,
+                                     {'Retry-After': str(math.ceil(retry_after))})
+            latitude, longitude = await geocode_address(request.app['http'], search["location"])
+            if sort == "distance" and not (latitude and longitude):
+                return json_response({"success": True, "results": [], "next_cursor": None})
+
+        # psycopg2 lets Postgres cast the raw JSON values; asyncpg wants typed params
+        if after is not None:
+            after = (CURSOR_VALUE_TYPES[sort](str(after[0])), after[1])
+        query, params = build_search_query(
+            text_query=search["text_query"],
+            guests=int(search["guests"]) if search["guests"] else None,
+            min_price=Decimal(str(search["min_price"])) if search["min_price"] is not None else None,
+            max_price=Decimal(str(search["max_price"])) if search["max_price"] is not None else None,
+            latitude=latitude, longitude=longitude,
+            date_from=date.fromisoformat(search["date_from"]) if search["date_from"] else None,
+            date_to=date.fromisoformat(search["date_to"]) if search["date_to"] else None,
+            sort=sort, after=after, limit=limit + 1 if limit else None
+        )
+
+        async with request.app['db'].acquire() as conn:
+            accommodations = await conn.fetch(to_asyncpg(query), *params)
+
+            next_cursor = None
+            if limit and len(accommodations) > limit:
+                accommodations = accommodations[:limit]
+                last = accommodations[-1]
+                next_cursor = encode_search_cursor(sort, last[5], last[0])
+
+            aids = [row[0] for row in accommodations]
+            rows = await conn.fetch(to_asyncpg(ACCOMMODATION_CARDS_SQL), request['user']['uid'], aids) if aids else []
+
+        cards = {
+            aid: {
+                "aid": aid,
+                "name": name,
+                "price_per_night": price,
+                "location": f"{city}, {country}",
+                "like_count": like_count,
+                "is_liked": is_liked,
+                "image_url": f"/accommodations/{aid}/image/1" if has_image else None
+            }
+            for aid, name, price, city, country, like_count, is_liked, has_image in rows
+        }
+        result = [cards[aid] for aid in aids if aid in cards]
+
+        if limit:
+            return json_response({"success": True, "results": result, "next_cursor": next_cursor})
+        return json_response({"success": True, "results": result})
+
+    except Exception as e:
+        print("Search accommodations error:", e)
+        return json_response({
+            "success": False,
+            "message": "Server error",
+            "error": str(e)
+        }, 500)
+
+
+async def open_resources(app):
+    app['db'] = await asyncpg.create_pool(ASYNC_DATABASE_URL, min_size=ASYNC_POOL_MIN, max_size=ASYNC_POOL_MAX)
+    app['http'] = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+
+
+async def close_resources(app):
+    await app['http'].close()
+    await app['db'].close()
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get(r'/accommodation/{aid:\d+}', get_accommodation_details)
+    app.router.add_get(r'/accommodations/{aid:\d+}/image/{image_index:\d+}', get_accommodation_image)
+    app.router.add_post('/search-accommodations', search_accommodations)
+    app.on_startup.append(open_resources)
+    app.on_cleanup.append(close_resources)
+    return app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    web.run_app(app, port=5002)
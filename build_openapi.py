@@ -0,0 +1,22 @@
+"""Compile the @swag_from route specs into a static openapi.json.
+
+Usage: python build_openapi.py [output path]
+
+Run at image build time; production then starts with API_DOCS=static and never
+imports flasgger.
+"""
+import os
+import sys
+import json
+
+os.environ["API_DOCS"] = "flasgger"
+
+from app import app, swagger, OPENAPI_SPEC_PATH  # noqa: E402
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else OPENAPI_SPEC_PATH
+    with app.test_request_context():
+        spec = swagger.get_apispecs("apispec_1")
+    with open(output, "w") as spec_file:
+        json.dump(spec, spec_file, indent=2, sort_keys=True, default=str)
+    print(f"Wrote {len(spec.get('paths', {}))} paths to {output}")
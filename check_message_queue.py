@@ -0,0 +1,111 @@
+"""Check that Socket.IO messages published by one worker reach the others through Postgres.
+
+Usage: python check_message_queue.py [message queue URL] [--workers N] [--messages M]
+
+Starts one publishing and N listening PostgresManager instances on SOCKETIO_MESSAGE_QUEUE
+(or the URL given), as N + 1 gunicorn workers would. The publisher sends a small message,
+one larger than a single NOTIFY payload, and then M messages as fast as it can; every
+listener must receive all of them intact and in order. Prints the fan-out throughput and
+exits non-zero on any loss.
+"""
+import sys
+import time
+import queue
+import threading
+
+from app import PostgresManager, SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CHANNEL, NOTIFY_MAX_PAYLOAD
+
+CHECK_TIMEOUT = 10
+
+
+def start_listener(dsn, channel) -> queue.Queue:
+    listener = PostgresManager(dsn, channel=channel, write_only=True)
+    received = queue.Queue()
+
+    def listen():
+        for message in listener._listen():
+            received.put(listener.json.loads(message))
+
+    threading.Thread(target=listen, daemon=True).start()
+    return received
+
+
+def receive(received: queue.Queue, count: int, deadline: float) -> list:
+    """Up to count messages, stopping at the deadline."""
+    messages = []
+    while len(messages) < count:
+        try:
+            messages.append(received.get(timeout=max(0.0, deadline - time.monotonic())))
+        except queue.Empty:
+            break
+    return messages
+
+
+def check(dsn, workers: int = 3, count: int = 1000) -> list:
+    # Own channel, so workers already running on this queue never see the check messages
+    channel = f"{SOCKETIO_CHANNEL}_check"
+    publisher = PostgresManager(dsn, channel=channel, write_only=True)
+    listeners = [start_listener(dsn, channel) for _ in range(workers)]
+
+    # LISTEN is only in place once a listener's connection is up: ping until all have one
+    deadline = time.monotonic() + CHECK_TIMEOUT
+    waiting = set(range(workers))
+    while waiting:
+        if time.monotonic() > deadline:
+            return [f"{len(waiting)} listener(s) never received a ping"]
+        publisher._publish({"method": "check", "ping": True})
+        for n in list(waiting):
+            if receive(listeners[n], 1, time.monotonic() + 0.5):
+                waiting.discard(n)
+    time.sleep(0.5)
+    for received in listeners:
+        while not received.empty():
+            received.get()
+
+    problems = []
+    messages = [
+        {"method": "emit", "event": "check", "data": "small", "host_id": publisher.host_id},
+        # Non-ASCII text, in case the JSON module does not escape it
+        {"method": "emit", "event": "check", "data": "Žilina č. " * (3 * NOTIFY_MAX_PAYLOAD // 10),
+         "host_id": publisher.host_id},
+    ]
+    for message in messages:
+        size = len(publisher.json.dumps(message).encode())
+        publisher._publish(message)
+        delivered = [receive(received, 1, time.monotonic() + CHECK_TIMEOUT) for received in listeners]
+        if any(got != [message] for got in delivered):
+            problems.append(f"{size}-byte message was lost or altered on "
+                            f"{sum(got != [message] for got in delivered)} of {workers} listener(s)")
+        else:
+            print(f"OK   {size}-byte message delivered to {workers} listener(s)")
+
+    started = time.monotonic()
+    for n in range(count):
+        publisher._publish({"method": "emit", "event": "check", "data": n, "host_id": publisher.host_id})
+    published = time.monotonic() - started
+    deadline = time.monotonic() + CHECK_TIMEOUT
+    for worker, received in enumerate(listeners):
+        got = [message["data"] for message in receive(received, count, deadline)]
+        if got != list(range(count)):
+            problems.append(f"listener {worker} received {len(got)} of {count} messages"
+                            + (" out of order" if sorted(got) != got else ""))
+    elapsed = time.monotonic() - started
+    if not problems:
+        print(f"OK   {count} messages to {workers} listener(s) in {elapsed:.2f}s: published at "
+              f"{count / published:.0f}/s, {count * workers / elapsed:.0f} deliveries/s")
+    return problems
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else 3
+    count = int(args[args.index("--messages") + 1]) if "--messages" in args else 1000
+    dsn = args[0] if args and not args[0].startswith("--") else SOCKETIO_MESSAGE_QUEUE
+    if not dsn or not dsn.startswith(("postgres://", "postgresql://")):
+        print("SOCKETIO_MESSAGE_QUEUE is not a Postgres URL; nothing to check")
+        sys.exit(2)
+    problems = check(dsn, workers, count)
+    for problem in problems:
+        print(f"FAIL {problem}")
+    print("Messages delivered between workers" if not problems else f"{len(problems)} problem(s)")
+    sys.exit(1 if problems else 0)
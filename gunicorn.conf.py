@@ -0,0 +1,30 @@
+"""Gunicorn settings for the RoomFinder API.
+
+The app is preloaded in the master; each worker creates and warms up its own
+database pool in post_fork, before it starts accepting connections. Background
+green threads start in post_worker_init: the eventlet worker installs a fresh hub
+in init_process, after post_fork, and anything spawned before it never runs.
+"""
+import os
+
+bind = "0.0.0.0:5001"
+worker_class = "eventlet"
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+preload_app = True
+
+
+def post_fork(server, worker):
+    from app import warm_up_db_pool
+    try:
+        warm_up_db_pool()
+    except Exception as e:
+        # The pool still connects lazily on first use
+        server.log.error(f"Worker {worker.pid}: DB warm-up failed: {e}")
+
+
+def post_worker_init(worker):
+    from app import ensure_accommodation_purger, ensure_job_workers
+    # Finish purging accommodations deleted before a restart, and run queued jobs
+    ensure_accommodation_purger()
+    ensure_job_workers()
+    worker.log.info(f"Worker {worker.pid} ready")
@@ -0,0 +1,524 @@
+"""Versioned schema migrations for the RoomFinder database.
+
+Usage:
+    python migrations.py                  apply pending migrations
+    python migrations.py verify           check indexes and query plans
+    python migrations.py verify --seed N  same, on N synthetic listings (rolled back); use a
+                                          production-sized N such as 100000, since the
+                                          planner rightly seq-scans small tables
+
+Every migration runs once, in order, and is recorded in schema_migrations.
+All pending migrations are applied in a single transaction and only change the
+schema; data backfills (BACKFILLS) run afterwards in small committed batches, once
+each, recorded in schema_backfills.
+"""
+import os
+import sys
+import json
+from datetime import date, timedelta
+import psycopg2
+from dotenv import load_dotenv
+
+from queries import (
+    ACCOMMODATION_DETAILS_SQL, ACCOMMODATION_DETAILS_ENRICHED_SQL, ACCOMMODATION_IMAGE_SQL,
+    ACCOMMODATION_CARDS_SQL, USER_LOGIN_SQL, LIKE_TOGGLE_SQL, LIKED_ACCOMMODATIONS_SQL,
+    MY_ACCOMMODATIONS_SQL, RESERVATION_CONFLICT_SQL, MY_RESERVATIONS_SQL, UPCOMING_RESERVATIONS_SQL,
+    OWNER_DASHBOARD_SQL, build_search_query
+)
+
+MIGRATIONS = [
+    (1, "accommodations.like_count", """
+        -- Counted from liked by backfill_like_counts()
+        ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS like_count integer NOT NULL DEFAULT 0;
+    """),
+    (2, "accommodations.search_vector", """
+        -- Filled for existing rows by backfill_search_vectors()
+        ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS search_vector tsvector;
+        CREATE INDEX IF NOT EXISTS idx_accommodations_search_vector ON accommodations USING GIN (search_vector);
+    """),
+    (3, "search price and popularity indexes", """
+        CREATE INDEX IF NOT EXISTS idx_accommodations_price_guests
+            ON accommodations (price_per_night, max_guests, aid);
+        CREATE INDEX IF NOT EXISTS idx_accommodations_popularity
+            ON accommodations (like_count, aid);
+    """),
+    (4, "indexes for hot predicates", """
+        CREATE INDEX IF NOT EXISTS idx_reservations_aid_dates ON reservations (aid, "From", "To");
+        CREATE INDEX IF NOT EXISTS idx_reservations_reserved_by_from ON reservations (reserved_by, "From");
+        CREATE INDEX IF NOT EXISTS idx_pictures_aid_pid ON pictures (aid, pid);
+        CREATE INDEX IF NOT EXISTS idx_accommodations_owner_id ON accommodations (owner_id);
+
+        -- A user can like a listing only once; drop historical duplicates first
+        DELETE FROM liked a USING liked b
+        WHERE a.ctid < b.ctid AND a.uid = b.uid AND a.aid = b.aid;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_liked_uid_aid ON liked (uid, aid);
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'users_email_key') THEN
+                ALTER TABLE users ADD CONSTRAINT users_email_key UNIQUE (email);
+            END IF;
+        END $$;
+    """),
+    (5, "occupancy_nights rollup", """
+        CREATE TABLE IF NOT EXISTS occupancy_nights (
+            aid integer NOT NULL,
+            night date NOT NULL,
+            rid integer NOT NULL,
+            is_checkin boolean NOT NULL DEFAULT false,
+            PRIMARY KEY (aid, night, rid)
+        );
+        CREATE INDEX IF NOT EXISTS idx_occupancy_nights_rid ON occupancy_nights (rid);
+        -- Nights of existing reservations are added by backfill_occupancy_nights()
+    """),
+    (6, "idempotency_keys", """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            uid integer NOT NULL,
+            key text NOT NULL,
+            endpoint text NOT NULL,
+            fingerprint text NOT NULL,
+            status_code integer,
+            content_type text,
+            body bytea,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (uid, key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at);
+    """),
+    (7, "accommodations.address and pictures.sha256", """
+        -- The address as the owner typed it, so edits re-geocode only when it changes
+        ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS address text;
+        -- Hex SHA-256 of image, set by the app on insert; older rows are filled in
+        -- batches by backfill_picture_hashes() so the table is never rewritten under lock
+        ALTER TABLE pictures ADD COLUMN IF NOT EXISTS sha256 text;
+    """),
+    (8, "accommodations soft delete", """
+        ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS deleted_at timestamptz;
+        ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS purged_at timestamptz;
+        CREATE INDEX IF NOT EXISTS idx_accommodations_purge_pending
+            ON accommodations (deleted_at) WHERE deleted_at IS NOT NULL AND purged_at IS NULL;
+    """),
+    (9, "jobs queue", """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id bigserial PRIMARY KEY,
+            kind text NOT NULL,
+            payload jsonb NOT NULL DEFAULT '{}',
+            status text NOT NULL DEFAULT 'pending',
+            attempts integer NOT NULL DEFAULT 0,
+            max_attempts integer NOT NULL DEFAULT 5,
+            run_at timestamptz NOT NULL DEFAULT now(),
+            last_error text,
+            created_at timestamptz NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON jobs (run_at) WHERE status = 'pending';
+        -- New listings are geocoded by a job after the row is committed
+        ALTER TABLE accommodations ALTER COLUMN latitude DROP NOT NULL, ALTER COLUMN longitude DROP NOT NULL;
+    """),
+    (10, "users.list_version", """
+        -- Bumped with every write that changes a user's list endpoints; served as their ETag
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS list_version bigint NOT NULL DEFAULT 0;
+        -- Finds the likers whose lists show a changed accommodation
+        CREATE INDEX IF NOT EXISTS idx_liked_aid ON liked (aid);
+    """),
+    (11, "accommodations.geocode_status", """
+        -- 'pending' until the geocode job places a new listing, 'failed' if it gave up;
+        -- only 'done' listings are shown to other users
+        ALTER TABLE accommodations ADD COLUMN IF NOT EXISTS geocode_status text NOT NULL DEFAULT 'done';
+    """),
+    (12, "bulk_imports", """
+        -- Validated rows wait here for the import job, which replaces them with the
+        -- per-row report clients poll for
+        CREATE TABLE IF NOT EXISTS bulk_imports (
+            id bigserial PRIMARY KEY,
+            uid integer NOT NULL,
+            status text NOT NULL DEFAULT 'pending',
+            rows jsonb,
+            imported jsonb,
+            errors jsonb,
+            message text,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            finished_at timestamptz
+        );
+        -- The archive images those rows reference, by their name in the archive; dropped
+        -- once the import finishes
+        CREATE TABLE IF NOT EXISTS bulk_import_images (
+            import_id bigint NOT NULL REFERENCES bulk_imports (id) ON DELETE CASCADE,
+            name text NOT NULL,
+            sha256 text NOT NULL,
+            image bytea NOT NULL,
+            PRIMARY KEY (import_id, name)
+        );
+        -- Jobs that run longer than JOB_LEASE_SECONDS (bulk imports) carry their own lease
+        ALTER TABLE jobs ADD COLUMN IF NOT EXISTS lease_seconds double precision;
+    """),
+]
+
+# Rows per backfill transaction
+BACKFILL_BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", "500"))
+# pg_try_advisory_lock key held while backfilling, so concurrent runners don't repeat the work
+BACKFILL_LOCK_KEY = 2_604_036
+
+EXPECTED_INDEXES = [
+    "idx_accommodations_search_vector",
+    "idx_accommodations_price_guests",
+    "idx_accommodations_popularity",
+    "idx_accommodations_owner_id",
+    "idx_reservations_aid_dates",
+    "idx_reservations_reserved_by_from",
+    "idx_pictures_aid_pid",
+    "idx_liked_uid_aid",
+    "users_email_key",
+    "idx_occupancy_nights_rid",
+    "idx_idempotency_keys_created_at",
+    "idx_accommodations_purge_pending",
+    "idx_jobs_runnable",
+    "idx_liked_aid",
+]
+
+# Day the plan checks book and look up reservations for
+PLAN_DAY = date(2025, 6, 1)
+
+
+def plan_checks(uid: int = 1, aid: int = 1, email: str = "plan-check@example.com") -> list:
+    """(endpoint, query as issued by app.py, params, index the plan must use), probing the given ids.
+
+    The SQL is the app's own, from queries.py, so the checks and the warm-up follow
+    every query change.
+    """
+    return [
+        ("login", USER_LOGIN_SQL, (email,), "users_email_key"),
+        ("like_dislike", LIKE_TOGGLE_SQL, {"aid": aid, "uid": uid}, "idx_liked_uid_aid"),
+        ("liked-accommodations", LIKED_ACCOMMODATIONS_SQL, (uid,), "idx_liked_uid_aid"),
+        ("my-accommodations", MY_ACCOMMODATIONS_SQL, (uid,), "idx_accommodations_owner_id"),
+        ("make-reservation", RESERVATION_CONFLICT_SQL, (aid, PLAN_DAY, PLAN_DAY + timedelta(days=9)),
+         "idx_reservations_aid_dates"),
+        ("my-reservations", MY_RESERVATIONS_SQL, (uid,), "idx_reservations_reserved_by_from"),
+        ("upcoming_reservations", UPCOMING_RESERVATIONS_SQL, (uid, PLAN_DAY), "idx_reservations_reserved_by_from"),
+        ("accommodation detail", ACCOMMODATION_DETAILS_SQL, (aid,), "accommodations_pkey"),
+        ("accommodation detail (enriched)", ACCOMMODATION_DETAILS_ENRICHED_SQL, (uid, PLAN_DAY, PLAN_DAY, aid),
+         "accommodations_pkey"),
+        ("accommodation image", ACCOMMODATION_IMAGE_SQL, (aid, 0), "idx_pictures_aid_pid"),
+        ("accommodation cards", ACCOMMODATION_CARDS_SQL, (uid, [aid, aid + 1, aid + 2]), "accommodations_pkey"),
+        ("owner/dashboard", OWNER_DASHBOARD_SQL, {"today": PLAN_DAY, "uid": uid}, "occupancy_nights_pkey"),
+        ("search by text",
+         *build_search_query(text_query="sea view apartment", sort="relevance", limit=21),
+         "idx_accommodations_search_vector"),
+        ("search by price",
+         *build_search_query(min_price=50, max_price=150, guests=2, sort="price", limit=21),
+         "idx_accommodations_price_guests"),
+        ("search by popularity, next page",
+         *build_search_query(sort="popularity", after=(50, 1000), limit=21),
+         "idx_accommodations_popularity"),
+        ("search by dates",
+         *build_search_query(date_from=PLAN_DAY, date_to=PLAN_DAY + timedelta(days=6), limit=21),
+         "idx_reservations_aid_dates"),
+    ]
+
+
+# What the pool warm-up EXPLAINs; the ids don't matter there
+PLAN_CHECKS = plan_checks()
+
+# Shape of the verify --seed data: users per listing, listings per owner, and
+# reservations and likes per listing
+SEED_USERS_PER_LISTING = 2
+SEED_LISTINGS_PER_OWNER = 10
+SEED_RESERVATIONS_PER_LISTING = 2
+SEED_LIKES_PER_LISTING = 3
+
+
+def migrate(conn) -> list[int]:
+    applied_now = []
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version integer PRIMARY KEY,
+                name text NOT NULL,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            );
+        """)
+        # Serialize concurrent runners (e.g. several containers starting at once)
+        cur.execute("LOCK TABLE schema_migrations IN EXCLUSIVE MODE;")
+        cur.execute("SELECT version FROM schema_migrations;")
+        applied = {row[0] for row in cur.fetchall()}
+
+        for version, name, sql in MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"Applying migration {version}: {name}")
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name))
+            applied_now.append(version)
+    conn.commit()
+    return applied_now
+
+
+def backfill_picture_hashes(conn) -> int:
+    """Fill pictures.sha256 for rows stored before the app wrote it, one committed batch at a time."""
+    total = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE pictures SET sha256 = encode(sha256(image), 'hex')
+                WHERE pid IN (SELECT pid FROM pictures WHERE sha256 IS NULL LIMIT %s);
+            """, (BACKFILL_BATCH_SIZE,))
+            count = cur.rowcount
+        conn.commit()
+        total += count
+        if count < BACKFILL_BATCH_SIZE:
+            return total
+
+
+def backfill_in_batches(conn, sql: str) -> int:
+    """Run sql over the table in primary-key order, one committed batch at a time.
+
+    sql gets %(after)s and %(limit)s and must return the keys of the batch it handled.
+    """
+    total, after = 0, 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(sql, {"after": after, "limit": BACKFILL_BATCH_SIZE})
+            keys = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        total += len(keys)
+        if len(keys) < BACKFILL_BATCH_SIZE:
+            return total
+        after = max(keys)
+
+
+def backfill_like_counts(conn) -> int:
+    """Count accommodations.like_count from liked (after migration 4 dropped duplicate likes)."""
+    return backfill_in_batches(conn, """
+        WITH batch AS (
+            SELECT aid FROM accommodations WHERE aid > %(after)s ORDER BY aid LIMIT %(limit)s
+        ), counted AS (
+            UPDATE accommodations a
+            SET like_count = (SELECT COUNT(*) FROM liked l WHERE l.aid = a.aid)
+            FROM batch WHERE a.aid = batch.aid
+        )
+        SELECT aid FROM batch;
+    """)
+
+
+def backfill_search_vectors(conn) -> int:
+    """Fill accommodations.search_vector for rows stored before the app wrote it."""
+    return backfill_in_batches(conn, """
+        WITH batch AS (
+            SELECT aid FROM accommodations WHERE aid > %(after)s ORDER BY aid LIMIT %(limit)s
+        ), filled AS (
+            UPDATE accommodations a
+            SET search_vector = setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                                setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+            FROM batch WHERE a.aid = batch.aid AND a.search_vector IS NULL
+        )
+        SELECT aid FROM batch;
+    """)
+
+
+def backfill_occupancy_nights(conn) -> int:
+    """Add the occupancy_nights of reservations made before the app maintained them."""
+    return backfill_in_batches(conn, """
+        WITH batch AS (
+            SELECT rid, aid, "From", "To" FROM reservations WHERE rid > %(after)s ORDER BY rid LIMIT %(limit)s
+        ), nights AS (
+            INSERT INTO occupancy_nights (aid, night, rid, is_checkin)
+            SELECT b.aid, d::date, b.rid, d::date = b."From"
+            FROM batch b, generate_series(b."From", b."To", interval '1 day') d
+            ON CONFLICT DO NOTHING
+        )
+        SELECT rid FROM batch;
+    """)
+
+
+# (name, function) for data backfills that run once, after the migrations they follow
+BACKFILLS = [
+    ("accommodations.like_count", backfill_like_counts),
+    ("accommodations.search_vector", backfill_search_vectors),
+    ("occupancy_nights", backfill_occupancy_nights),
+]
+
+
+def run_backfills(conn) -> list[str]:
+    """Run the BACKFILLS not recorded in schema_backfills yet; returns their names.
+
+    A runner that finds another one backfilling skips them; that one finishes the work.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_backfills (
+                name text PRIMARY KEY,
+                finished_at timestamptz NOT NULL DEFAULT now()
+            );
+        """)
+        cur.execute("SELECT pg_try_advisory_lock(%s);", (BACKFILL_LOCK_KEY,))
+        locked = cur.fetchone()[0]
+        cur.execute("SELECT name FROM schema_backfills;")
+        finished = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    if not locked:
+        return []
+
+    ran = []
+    try:
+        for name, backfill in BACKFILLS:
+            if name in finished:
+                continue
+            print(f"Backfilling {name}")
+            backfill(conn)
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO schema_backfills (name) VALUES (%s) ON CONFLICT DO NOTHING;", (name,))
+            conn.commit()
+            ran.append(name)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (BACKFILL_LOCK_KEY,))
+        conn.commit()
+    return ran
+
+
+def missing_indexes(conn) -> list[str]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema();")
+        present = {row[0] for row in cur.fetchall()}
+    return [name for name in EXPECTED_INDEXES if name not in present]
+
+
+def plan_nodes(plan: dict) -> list[dict]:
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes += plan_nodes(child)
+    return nodes
+
+
+def seed(cur, listings: int) -> tuple[int, int, str]:
+    """Synthetic data sized like production, so the planner sees realistic statistics.
+
+    Listings, reservations and likes are spread over many users the way real traffic
+    is. Returns a typical seeded owner's (uid, one of their aids, email) to probe with.
+    """
+    users = listings * SEED_USERS_PER_LISTING
+    owners = max(1, listings // SEED_LISTINGS_PER_OWNER)
+    cur.execute("""
+        INSERT INTO users (email, password, role)
+        SELECT 'plan-check-seed-' || i || '@example.com', 'x',
+               (CASE WHEN i %% %s = 0 AND i / %s < %s THEN 'owner' ELSE 'guest' END)::user_role
+        FROM generate_series(0, %s - 1) AS i;
+    """, (SEED_LISTINGS_PER_OWNER, SEED_LISTINGS_PER_OWNER, owners, users))
+    # Seeded users and listings numbered from 0, whatever ids the sequences handed out
+    cur.execute("""
+        CREATE TEMP TABLE seed_users ON COMMIT DROP AS
+        SELECT (row_number() OVER (ORDER BY uid) - 1)::integer AS n, uid
+        FROM users WHERE email LIKE 'plan-check-seed-%%@example.com';
+        CREATE UNIQUE INDEX ON seed_users (n);
+        ANALYZE seed_users;
+    """)
+    cur.execute("""
+        INSERT INTO accommodations
+            (name, location_city, location_country, owner_id, max_guests, latitude, longitude,
+             price_per_night, description, iban, like_count, search_vector)
+        SELECT 'Listing ' || i, 'City ' || (i %% 500), 'Country', u.uid, 1 + i %% 8,
+               40 + random() * 10, 10 + random() * 10, 20 + (i * 7919) %% 480,
+               'Description ' || i, 'SK0000000000000000000000', (i * 31) %% 200,
+               to_tsvector('simple', 'Listing ' || i || ' description ' || i)
+        FROM generate_series(0, %s - 1) AS i
+        JOIN seed_users u ON u.n = (i %% %s) * %s;
+    """, (listings, owners, SEED_LISTINGS_PER_OWNER))
+    cur.execute("""
+        CREATE TEMP TABLE seed_listings ON COMMIT DROP AS
+        SELECT (row_number() OVER (ORDER BY a.aid) - 1)::integer AS n, a.aid
+        FROM accommodations a JOIN seed_users u ON u.uid = a.owner_id;
+        ANALYZE seed_listings;
+    """)
+    # Stays spread over the year, each booked by a different guest
+    cur.execute("""
+        INSERT INTO reservations (aid, "From", "To", reserved_by)
+        SELECT l.aid, DATE '2025-01-01' + (l.n * 7 + k * 173) %% 365,
+               DATE '2025-01-01' + (l.n * 7 + k * 173) %% 365 + 1 + (l.n + k) %% 6, u.uid
+        FROM seed_listings l
+        CROSS JOIN generate_series(0, %s - 1) AS k
+        JOIN seed_users u ON u.n = (l.n::bigint * 7919 + k * 104729) %% %s;
+    """, (SEED_RESERVATIONS_PER_LISTING, users))
+    cur.execute("""
+        INSERT INTO occupancy_nights (aid, night, rid, is_checkin)
+        SELECT r.aid, d::date, r.rid, d::date = r."From"
+        FROM reservations r, generate_series(r."From", r."To", interval '1 day') d
+        WHERE r.aid IN (SELECT aid FROM seed_listings);
+    """)
+    cur.execute("""
+        INSERT INTO pictures (aid, image, sha256)
+        SELECT aid, decode('ffd8ffd9', 'hex'), encode(sha256(decode('ffd8ffd9', 'hex')), 'hex')
+        FROM seed_listings, generate_series(1, 3);
+    """)
+    cur.execute("""
+        INSERT INTO liked (uid, aid)
+        SELECT DISTINCT u.uid, l.aid
+        FROM seed_listings l
+        CROSS JOIN generate_series(0, %s - 1) AS k
+        JOIN seed_users u ON u.n = (l.n::bigint * 31 + k * 7 + 1) %% %s;
+    """, (SEED_LIKES_PER_LISTING, users))
+    cur.execute("ANALYZE users, accommodations, reservations, occupancy_nights, pictures, liked;")
+
+    # An owner from the middle of the range; like everyone they also book and like listings
+    cur.execute("""
+        SELECT u.uid, a.aid, s.email
+        FROM seed_users u
+        JOIN users s ON s.uid = u.uid
+        JOIN accommodations a ON a.owner_id = u.uid
+        WHERE u.n = %s
+        ORDER BY a.aid LIMIT 1;
+    """, (owners // 2 * SEED_LISTINGS_PER_OWNER,))
+    return cur.fetchone()
+
+
+def check_plans(conn, seed_listings: int = 0) -> list[str]:
+    """EXPLAIN every hot query and report plans that miss their expected index or seq-scan a table.
+
+    Without seeding, sequential scans are disabled so the check proves the index is
+    usable for the predicate. With seeding the planner runs on its normal costs.
+    Everything happens in a transaction that is rolled back.
+    """
+    failures = []
+    try:
+        with conn.cursor() as cur:
+            if seed_listings:
+                checks = plan_checks(*seed(cur, seed_listings))
+            else:
+                checks = PLAN_CHECKS
+                cur.execute("SET LOCAL enable_seqscan = off;")
+            for endpoint, sql, params, index in checks:
+                cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                nodes = plan_nodes(plan[0]["Plan"])
+                used = {node["Index Name"] for node in nodes if "Index Name" in node}
+                if index not in used:
+                    failures.append(f"{endpoint}: expected {index}, plan used {sorted(used) or 'no index'}")
+                scanned = sorted({node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"})
+                if scanned:
+                    failures.append(f"{endpoint}: sequential scan on {', '.join(scanned)}")
+    finally:
+        conn.rollback()
+    return failures
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    conn = psycopg2.connect(os.environ.get("DATABASE_URL"))
+    try:
+        if sys.argv[1:2] == ["verify"]:
+            seed_listings = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else 0
+            problems = [f"missing index {name}" for name in missing_indexes(conn)]
+            problems += check_plans(conn, seed_listings)
+            for problem in problems:
+                print(f"FAIL {problem}")
+            print("All indexes present and used" if not problems else f"{len(problems)} problem(s)")
+            sys.exit(1 if problems else 0)
+
+        applied = migrate(conn)
+        print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+        run_backfills(conn)
+        hashed = backfill_picture_hashes(conn)
+        if hashed:
+            print(f"Hashed {hashed} stored picture(s)")
+    finally:
+        conn.close()
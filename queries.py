@@ -0,0 +1,390 @@
+"""SQL shared by the Flask app (app.py), the asyncio read server (async_reads.py)
+and the plan checks and pool warm-up in migrations.py.
+
+Queries use psycopg2's %s placeholders; async_reads converts them for asyncpg.
+"""
+import json
+import base64
+
+ACCOMMODATION_DETAILS_SQL = """
+    SELECT 
+        a.name,
+        a.location_city,
+        a.location_country,
+        a.max_guests,
+        a.latitude,
+        a.longitude,
+        a.price_per_night,
+        a.description,
+        u.email AS owner_email,
+        a.like_count
+    FROM accommodations a
+    JOIN users u ON u.uid = a.owner_id
+    WHERE a.aid = %s AND a.deleted_at IS NULL AND a.geocode_status = 'done';
+"""
+
+# Everything the listing screen needs: params (uid, today, today, aid).
+# The next free range starts today or the day after a stay ends, on the first such
+# day not inside another stay, and ends the day before the next stay (NULL: open).
+ACCOMMODATION_DETAILS_ENRICHED_SQL = """
+    SELECT
+        a.name,
+        a.location_city,
+        a.location_country,
+        a.max_guests,
+        a.latitude,
+        a.longitude,
+        a.price_per_night,
+        a.description,
+        u.email AS owner_email,
+        a.like_count,
+        a.iban,
+        (SELECT array_agg(COALESCE(p.sha256, encode(sha256(p.image), 'hex')) ORDER BY p.pid)
+         FROM pictures p WHERE p.aid = a.aid) AS image_hashes,
+        EXISTS (SELECT 1 FROM liked l WHERE l.aid = a.aid AND l.uid = %s) AS is_liked,
+        free.free_from,
+        free.free_until
+    FROM accommodations a
+    JOIN users u ON u.uid = a.owner_id
+    LEFT JOIN LATERAL (
+        SELECT
+            s.day AS free_from,
+            (SELECT MIN(r."From") - 1 FROM reservations r WHERE r.aid = a.aid AND r."From" > s.day) AS free_until
+        FROM (
+            SELECT %s::date AS day
+            UNION ALL
+            SELECT r."To" + 1 FROM reservations r WHERE r.aid = a.aid AND r."To" >= %s::date
+        ) s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM reservations r
+            WHERE r.aid = a.aid AND s.day BETWEEN r."From" AND r."To"
+        )
+        ORDER BY s.day
+        LIMIT 1
+    ) free ON TRUE
+    WHERE a.aid = %s AND a.deleted_at IS NULL AND a.geocode_status = 'done';
+"""
+
+def enriched_accommodation(aid, row, image_url) -> tuple[dict, int, bool]:
+    """Split an ACCOMMODATION_DETAILS_ENRICHED_SQL row into the cacheable payload,
+    like_count and is_liked. image_url(aid, index) builds the 1-based image links."""
+    (name, city, country, guests, lat, lon, price, desc, owner_email, like_count, iban,
+     image_hashes, is_liked, free_from, free_until) = row
+    image_hashes = list(image_hashes or [])
+
+    shared = {
+        'aid': aid,
+        'name': name,
+        'location': f"{city}, {country}",
+        'max_guests': guests,
+        'latitude': lat,
+        'longitude': lon,
+        'price_per_night': price,
+        'description': desc,
+        'owner_email': owner_email,
+        'iban': iban,
+        'image_count': len(image_hashes),
+        'images': [image_url(aid, i) for i in range(1, len(image_hashes) + 1)],
+        # Content hashes in image order, for PATCH /accommodation/<aid> image diffs
+        'image_sha256': image_hashes,
+        'next_free': {
+            'from': free_from.isoformat() if free_from else None,
+            'to': free_until.isoformat() if free_until else None
+        }
+    }
+    return shared, like_count, is_liked
+
+# Per-user part of a cached enriched detail: params (uid, aid)
+ACCOMMODATION_VIEWER_SQL = """
+    SELECT
+        a.like_count,
+        EXISTS (SELECT 1 FROM liked l WHERE l.aid = a.aid AND l.uid = %s) AS is_liked
+    FROM accommodations a
+    WHERE a.aid = %s AND a.deleted_at IS NULL AND a.geocode_status = 'done';
+"""
+
+ACCOMMODATION_IMAGE_SQL = """
+    SELECT p.image
+    FROM pictures p
+    JOIN accommodations a ON a.aid = p.aid AND a.deleted_at IS NULL
+    WHERE p.aid = %s
+    ORDER BY p.pid ASC
+    LIMIT 1 OFFSET %s;
+"""
+
+# Summary cards with the caller's like state: params (uid, list of aids)
+ACCOMMODATION_CARDS_SQL = """
+    SELECT
+        a.aid,
+        a.name,
+        a.price_per_night,
+        a.location_city,
+        a.location_country,
+        a.like_count,
+        EXISTS (SELECT 1 FROM liked l WHERE l.aid = a.aid AND l.uid = %s) AS is_liked,
+        EXISTS (SELECT 1 FROM pictures p WHERE p.aid = a.aid) AS has_image
+    FROM accommodations a
+    WHERE a.aid = ANY(%s) AND a.deleted_at IS NULL AND a.geocode_status = 'done';
+"""
+
+USER_LOGIN_SQL = """
+    SELECT uid, password, role FROM users WHERE email = %s;
+"""
+
+# Toggle the caller's like, bump like_count and return the notification data:
+# params {aid, uid}; rows (owner_id, name, liker email, liked?, like_count)
+LIKE_TOGGLE_SQL = """
+    WITH acc AS (
+        SELECT aid, owner_id, name
+        FROM accommodations
+        WHERE aid = %(aid)s AND deleted_at IS NULL AND geocode_status = 'done'
+    ), removed AS (
+        DELETE FROM liked
+        WHERE uid = %(uid)s AND aid IN (SELECT aid FROM acc)
+        RETURNING aid
+    ), added AS (
+        INSERT INTO liked (uid, aid)
+        SELECT %(uid)s, aid FROM acc
+        WHERE NOT EXISTS (SELECT 1 FROM removed)
+        ON CONFLICT DO NOTHING
+        RETURNING aid
+    ), counter AS (
+        UPDATE accommodations
+        SET like_count = GREATEST(
+            like_count + (SELECT COUNT(*) FROM added) - (SELECT COUNT(*) FROM removed), 0)
+        WHERE aid IN (SELECT aid FROM acc)
+        RETURNING like_count
+    )
+    SELECT
+        acc.owner_id,
+        acc.name,
+        (SELECT email FROM users WHERE uid = %(uid)s),
+        NOT EXISTS (SELECT 1 FROM removed),
+        (SELECT like_count FROM counter)
+    FROM acc;
+"""
+
+LIKED_ACCOMMODATIONS_SQL = """
+    SELECT
+        a.aid,
+        a.name,
+        a.location_city,
+        a.location_country,
+        a.price_per_night
+    FROM liked l
+    JOIN accommodations a ON a.aid = l.aid
+    WHERE l.uid = %s AND a.deleted_at IS NULL
+    LIMIT 20;
+"""
+
+MY_ACCOMMODATIONS_SQL = """
+    SELECT
+        a.aid,
+        a.name,
+        a.location_city,
+        a.location_country,
+        a.geocode_status
+    FROM accommodations a
+    WHERE a.owner_id = %s AND a.deleted_at IS NULL;
+"""
+
+# Any reservation overlapping [from, to]: params (aid, from, to)
+RESERVATION_CONFLICT_SQL = """
+    SELECT * FROM reservations
+    WHERE aid = %s
+        AND NOT (%s > "To" OR %s < "From");
+"""
+
+MY_RESERVATIONS_SQL = """
+    SELECT
+        r.rid,
+        r.aid,
+        a.location_city,
+        a.location_country
+    FROM reservations r
+    JOIN accommodations a ON r.aid = a.aid
+    WHERE r.reserved_by = %s AND a.deleted_at IS NULL;
+"""
+
+# params (uid, today)
+UPCOMING_RESERVATIONS_SQL = """
+    SELECT r."From", r."To"
+    FROM reservations r
+    JOIN accommodations a ON a.aid = r.aid AND a.deleted_at IS NULL
+    WHERE r.reserved_by = %s AND r."From" >= %s
+    ORDER BY r."From"
+"""
+
+# Per-listing occupancy from the occupancy_nights rollup: params {today, uid}
+OWNER_DASHBOARD_SQL = """
+    SELECT
+        a.aid,
+        a.name,
+        a.like_count,
+        COUNT(o.rid) FILTER (WHERE o.is_checkin) AS upcoming,
+        COUNT(DISTINCT o.night) FILTER (WHERE o.night < %(today)s + 30) AS nights_30,
+        COUNT(DISTINCT o.night) FILTER (WHERE o.night < %(today)s + 90) AS nights_90,
+        COUNT(DISTINCT o.night) FILTER (WHERE o.night < %(today)s + 90) * a.price_per_night AS revenue_90
+    FROM accommodations a
+    LEFT JOIN occupancy_nights o ON o.aid = a.aid AND o.night >= %(today)s
+    WHERE a.owner_id = %(uid)s AND a.deleted_at IS NULL
+    GROUP BY a.aid
+    ORDER BY a.aid;
+"""
+
+SEARCH_SORTS = ("relevance", "price", "price_desc", "distance", "popularity")
+
+HAVERSINE_SQL = """
+    6371000 * acos(LEAST(1.0,
+        cos(radians(%s)) * cos(radians(a.latitude)) *
+        cos(radians(a.longitude) - radians(%s)) +
+        sin(radians(%s)) * sin(radians(a.latitude))
+    ))
+"""
+
+def build_search_query(text_query=None, guests=None, min_price=None, max_price=None,
+                       latitude=None, longitude=None, date_from=None, date_to=None,
+                       sort=None, after=None, limit=None) -> tuple[str, tuple]:
+    """Search SQL and params. Rows are (aid, name, price, city, country, sort_value).
+
+    Results are ordered by (sort_value, aid) so they can be paged with a keyset
+    cursor: `after` is the (sort_value, aid) of the last row of the previous page.
+    """
+    geo_params = [latitude, longitude, latitude]
+    # sort -> (expression, expression params, direction, cursor placeholder)
+    if sort == "relevance":
+        sort_sql, sort_params, direction, placeholder = (
+            "ts_rank(a.search_vector, websearch_to_tsquery('simple', %s))", [text_query], "DESC", "%s::real")
+    elif sort == "price":
+        sort_sql, sort_params, direction, placeholder = "a.price_per_night", [], "ASC", "%s"
+    elif sort == "price_desc":
+        sort_sql, sort_params, direction, placeholder = "a.price_per_night", [], "DESC", "%s"
+    elif sort == "popularity":
+        sort_sql, sort_params, direction, placeholder = "a.like_count", [], "DESC", "%s"
+    elif sort == "distance":
+        sort_sql, sort_params, direction, placeholder = HAVERSINE_SQL, geo_params, "ASC", "%s"
+    else:
+        sort_sql, sort_params, direction, placeholder = "a.aid", [], "ASC", "%s"
+
+    query = f"""
+        SELECT
+            a.aid,
+            a.name,
+            a.price_per_night,
+            a.location_city,
+            a.location_country,
+            {sort_sql} AS sort_value
+        FROM accommodations a
+        WHERE a.deleted_at IS NULL AND a.geocode_status = 'done'
+    """
+    params = list(sort_params)
+
+    # Fulltextové vyhľadávanie v názve a popise
+    if text_query:
+        query += " AND a.search_vector @@ websearch_to_tsquery('simple', %s)"
+        params.append(text_query)
+
+    # Filtrovanie podľa ceny
+    if min_price is not None:
+        query += " AND a.price_per_night >= %s"
+        params.append(min_price)
+    if max_price is not None:
+        query += " AND a.price_per_night <= %s"
+        params.append(max_price)
+
+    # Filtrovanie podľa počtu hostí
+    if guests:
+        query += " AND a.max_guests >= %s"
+        params.append(guests)
+
+    # Filtrovanie podľa vzdialenosti (Haversine formula)
+    if latitude and longitude:
+        query += f" AND ({HAVERSINE_SQL}) < 50000"
+        params.extend(geo_params)
+
+    # Over dostupnosť podľa dátumov
+    if date_from and date_to:
+        query += """
+            AND NOT EXISTS (
+                SELECT 1 FROM reservations r
+                WHERE r.aid = a.aid
+                AND NOT (%s > r."To" OR %s < r."From")
+            )
+        """
+        params.extend([date_from, date_to])
+
+    if after is not None:
+        op = "<" if direction == "DESC" else ">"
+        query += f" AND ({sort_sql}, a.aid) {op} ({placeholder}, %s)"
+        params.extend(sort_params + [after[0], after[1]])
+
+    query += f" ORDER BY {sort_sql} {direction}, a.aid {direction}"
+    params.extend(sort_params)
+
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, tuple(params)
+
+def encode_search_cursor(sort, sort_value, aid) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, sort_value, aid], default=str).encode()).decode()
+
+def decode_search_cursor(token: str, sort) -> tuple:
+    try:
+        cursor_sort, sort_value, aid = json.loads(base64.urlsafe_b64decode(token.encode()))
+        aid = int(aid)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Malformed cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    return sort_value, aid
+
+def parse_search_request(data: dict, max_limit: int) -> dict:
+    """Validate a search request body. Raises ValueError with the message for the 400."""
+    text_query = (data.get("q") or "").strip()
+    location = data.get("location")
+    sort = data.get("sort") or ("relevance" if text_query else None)
+    limit = data.get("limit")
+    cursor_token = data.get("cursor")
+
+    try:
+        min_price = float(data["min_price"]) if data.get("min_price") not in (None, "") else None
+        max_price = float(data["max_price"]) if data.get("max_price") not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("Invalid price filter")
+
+    if sort is not None and sort not in SEARCH_SORTS:
+        raise ValueError(f"Invalid sort, expected one of: {', '.join(SEARCH_SORTS)}")
+    if sort == "relevance" and not text_query:
+        raise ValueError("Sorting by relevance requires q")
+    if sort == "distance" and not location:
+        raise ValueError("Sorting by distance requires location")
+
+    if limit is not None or cursor_token:
+        try:
+            limit = int(limit) if limit is not None else max_limit
+        except (TypeError, ValueError):
+            raise ValueError("Invalid limit")
+        limit = max(1, min(limit, max_limit))
+
+    after = None
+    if cursor_token:
+        try:
+            after = decode_search_cursor(cursor_token, sort)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    return {
+        "location": location,
+        "date_from": data.get("from"),
+        "date_to": data.get("to"),
+        "guests": data.get("guests"),
+        "text_query": text_query,
+        "min_price": min_price,
+        "max_price": max_price,
+        "sort": sort,
+        "limit": limit,
+        "cursor": cursor_token,
+        "after": after,
+    }
@@ -0,0 +1,179 @@
+"""State shared by every worker on one host: the Flask app (app.py) and the asyncio
+read server (async_reads.py) both use it, so their rate limits are one budget.
+
+Point SHARED_STATE_DIR at the same memory-backed directory in every process (and
+container) that should share it.
+"""
+import os
+import json
+import time
+import mmap
+import fcntl
+import struct
+import hashlib
+import tempfile
+
+# Directory for state shared by the workers of one host (memory-backed where available)
+SHARED_STATE_DIR = os.environ.get("SHARED_STATE_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+# Token buckets per route class as "requests/seconds", overridable with RATE_LIMIT_<CLASS>
+RATE_LIMITS = {
+    route_class: os.environ.get(f"RATE_LIMIT_{route_class.upper()}", default)
+    for route_class, default in (("auth", "10/60"), ("geocode", "30/60"), ("upload", "20/60"))
+}
+
+
+class SharedSlots:
+    """Fixed-size table of float tuples in a memory-mapped file shared by every worker on the host.
+
+    Each record stores a 64-bit fingerprint of its key, and a key may live in any of
+    PROBES consecutive slots from its home slot, so colliding keys get their own
+    records. Only when all of them hold other live keys is the home slot taken over.
+    """
+
+    PROBES = 8
+
+    def __init__(self, name, slots, width=1):
+        self.path = os.path.join(SHARED_STATE_DIR, f"roomfinder-{name}")
+        self.slots = slots
+        self.width = width
+        self.record = struct.Struct(f"=Q{width}d")
+        self.map = None
+        self.fd = None
+        self.pid = None
+
+    def _mapped(self):
+        if self.pid != os.getpid():
+            size = self.slots * self.record.size
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+            self.fd = fd
+            self.pid = os.getpid()
+        return self.map
+
+    def _locate(self, key) -> tuple[int, int]:
+        """(fingerprint, offset of the first slot of the key's probe window)."""
+        digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+        # 0 marks an empty slot
+        fingerprint = int.from_bytes(digest, "little") or 1
+        home = fingerprint % (self.slots - self.PROBES + 1)
+        return fingerprint, home * self.record.size
+
+    def get(self, key) -> tuple:
+        mapped = self._mapped()
+        fingerprint, start = self._locate(key)
+        for n in range(self.PROBES):
+            stored, *values = self.record.unpack_from(mapped, start + n * self.record.size)
+            if stored == fingerprint:
+                return tuple(values)
+            if stored == 0:
+                break
+        return (0.0,) * self.width
+
+    def set(self, key, *values, expired=None) -> None:
+        self.update(key, lambda _: (values, None), expired)
+
+    def update(self, key, fn, expired=None):
+        """Atomically replace the key's record with fn(values) -> (new values, result); returns result.
+
+        A new key starts from zeros in the first empty slot of its window, or else in
+        one whose values expired(values) says are no longer needed. Only the window's
+        bytes are locked, so workers touching other keys rarely wait.
+        """
+        mapped = self._mapped()
+        fingerprint, start = self._locate(key)
+        length = self.PROBES * self.record.size
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, length, start)
+        try:
+            target, values = None, None
+            for n in range(self.PROBES):
+                offset = start + n * self.record.size
+                stored, *slot = self.record.unpack_from(mapped, offset)
+                if stored == fingerprint:
+                    target, values = offset, tuple(slot)
+                    break
+                if target is None and (stored == 0 or (expired is not None and expired(tuple(slot)))):
+                    target = offset
+            if values is None:
+                values = (0.0,) * self.width
+                if target is None:
+                    target = start
+            values, result = fn(values)
+            self.record.pack_into(mapped, target, fingerprint, *values)
+            return result
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, length, start)
+
+
+# "<route class>:<uid or IP>" -> (tokens left, time of last refill)
+rate_buckets = SharedSlots("rate-buckets", 65536, width=2)
+
+
+def take_token(key: str, limit: str) -> float:
+    """Take one token from the key's bucket; returns 0 if allowed, else seconds until one refills."""
+    capacity, period = (float(part) for part in limit.split("/"))
+    rate = capacity / period
+    now = time.time()
+
+    def refill(slot):
+        tokens, last = slot
+        # A zeroed slot is a bucket nobody has used yet: start it full
+        tokens = capacity if last == 0 else min(capacity, tokens + (now - last) * rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0.0
+        return (tokens, now), (1 - tokens) / rate
+
+    # A bucket that has refilled completely is the same as no bucket, so its slot can be reused
+    return rate_buckets.update(key, refill, expired=lambda slot: slot[1] + period <= now)
+
+
+# JSON [name, [[label, value], ...]] -> value: counters summed over, gauges last set by, every worker
+metric_values = SharedSlots("metrics", 4096)
+# Keys of metric_values, one per line, since the slots only keep fingerprints
+METRIC_KEYS_PATH = os.path.join(SHARED_STATE_DIR, "roomfinder-metric-keys")
+# Keys this process has seen in METRIC_KEYS_PATH (None until it is first read)
+listed_metric_keys = None
+
+
+def _metric_key(name: str, labels: dict) -> str:
+    """The metric's key in metric_values, listed in METRIC_KEYS_PATH if it isn't yet."""
+    global listed_metric_keys
+    key = json.dumps([name, sorted(labels.items())])
+    if listed_metric_keys is None:
+        listed_metric_keys = set(_read_metric_keys())
+    if key not in listed_metric_keys:
+        with open(METRIC_KEYS_PATH, "a+") as keys:
+            # Locked and read again, so workers writing the same new metric list it once
+            fcntl.lockf(keys, fcntl.LOCK_EX)
+            keys.seek(0)
+            listed_metric_keys.update(line.rstrip("\n") for line in keys if line.endswith("\n"))
+            if key not in listed_metric_keys:
+                keys.write(key + "\n")
+                listed_metric_keys.add(key)
+    return key
+
+
+def _read_metric_keys() -> list[str]:
+    try:
+        with open(METRIC_KEYS_PATH) as keys:
+            return [line.rstrip("\n") for line in keys if line.endswith("\n")]
+    except FileNotFoundError:
+        return []
+
+
+def metric_inc(name: str, amount: float = 1, **labels) -> None:
+    metric_values.update(_metric_key(name, labels), lambda slot: ((slot[0] + amount,), None))
+
+
+def metric_set(name: str, value: float, **labels) -> None:
+    metric_values.set(_metric_key(name, labels), value)
+
+
+def read_metrics() -> list[tuple[str, tuple, float]]:
+    """(name, sorted label items, value) of every metric any worker on the host has written."""
+    found = []
+    for key in set(_read_metric_keys()):
+        name, labels = json.loads(key)
+        found.append((name, tuple(tuple(item) for item in labels), metric_values.get(key)[0]))
+    return sorted(found)